@@ -7,7 +7,7 @@ import sys
 # All testbenches use tinyalu_utils, so store it in a central
 # place and add its path to the sys path so we can import it
 sys.path.insert(0, str(Path("..").resolve()))
-from tinyalu_utils import TinyAluBfm, Ops, alu_prediction  # noqa: E402
+from tinyalu_utils import TinyAluBfm, get_bfm, Ops, alu_prediction  # noqa: E402
 
 # # Testbench components
 # ## The testers
@@ -54,7 +54,7 @@ class MaxTester(BaseTester):
 class Driver(uvm_driver):
 
     def build_phase(self):
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
         self.gp = uvm_get_port("gp", self)
 
     async def run_phase(self):
@@ -64,6 +64,9 @@ class Driver(uvm_driver):
             aa, bb, op = await self.gp.get()
             await self.bfm.send_op(aa, bb, op)
 
+    def report_phase(self):
+        self.bfm.log_queue_stats()
+
 
 # ## Monitor
 # Figure 6: The Monitor() class takes the method name
@@ -77,7 +80,7 @@ class Monitor(uvm_monitor):
 
     def build_phase(self):
         self.ap = uvm_analysis_port("ap", self)
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
         self.get_method = getattr(self.bfm, self.method_name)
 
 # Figure 8: Getting the datum and writing it
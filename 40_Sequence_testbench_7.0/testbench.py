@@ -7,7 +7,7 @@ import random
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path("..").resolve()))
-from tinyalu_utils import TinyAluBfm, Ops, alu_prediction  # noqa: E402
+from tinyalu_utils import get_bfm, Ops, alu_prediction  # noqa: E402
 
 
 # # UVM sequences
@@ -16,7 +16,7 @@ from tinyalu_utils import TinyAluBfm, Ops, alu_prediction  # noqa: E402
 # Figure 2: The Driver refactored to work with sequences
 class Driver(uvm_driver):
     def start_of_simulation_phase(self):
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
 
     async def run_phase(self):
         await self.bfm.reset()
@@ -26,6 +26,9 @@ class Driver(uvm_driver):
             await self.bfm.send_op(cmd.A, cmd.B, cmd.op)
             self.seq_item_port.item_done()
 
+    def report_phase(self):
+        self.bfm.log_queue_stats()
+
 
 # ## Connecting the driver to the sequencer
 class AluEnv(uvm_env):
@@ -191,7 +194,7 @@ class Scoreboard(uvm_component):
 class Monitor(uvm_component):
     def __init__(self, name, parent, method_name):
         super().__init__(name, parent)
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
         self.get_method = getattr(self.bfm, method_name)
 
     def build_phase(self):
@@ -5,7 +5,7 @@ import pyuvm
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path("..").resolve()))
-from tinyalu_utils import TinyAluBfm, Ops, alu_prediction  # noqa: E402
+from tinyalu_utils import get_bfm, Ops, alu_prediction  # noqa: E402
 
 
 # # Fibonacci testbench: 7.1
@@ -40,7 +40,7 @@ class Driver(uvm_driver):
         self.ap = uvm_analysis_port("ap", self)
 
     def start_of_simulation_phase(self):
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
 
     #  Figure 5: The run phase gets a result back from the BFM
 
@@ -56,6 +56,9 @@ class Driver(uvm_driver):
             cmd.result = result
             self.seq_item_port.item_done()
 
+    def report_phase(self):
+        self.bfm.log_queue_stats()
+
 
 # ## AluEnv
 class AluEnv(uvm_env):
@@ -157,7 +160,7 @@ class Scoreboard(uvm_component):
 class Monitor(uvm_component):
     def __init__(self, name, parent, method_name):
         super().__init__(name, parent)
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
         self.get_method = getattr(self.bfm, method_name)
 
     def build_phase(self):
@@ -5,7 +5,7 @@ import pyuvm
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path("..").resolve()))
-from tinyalu_utils import TinyAluBfm, Ops, alu_prediction  # noqa: E402
+from tinyalu_utils import get_bfm, Ops, alu_prediction  # noqa: E402
 
 
 # # Fibonacci using `get_response()` testbench: 7.2
@@ -30,7 +30,7 @@ class Driver(uvm_driver):
         self.ap = uvm_analysis_port("ap", self)
 
     def start_of_simulation_phase(self):
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
 
     async def run_phase(self):
         await self.bfm.reset()
@@ -45,6 +45,9 @@ class Driver(uvm_driver):
             result_item.set_id_info(cmd)
             self.seq_item_port.item_done(result_item)
 
+    def report_phase(self):
+        self.bfm.log_queue_stats()
+
 
 # Figure 4: Sending commands to the TinyALU
 class FibonacciSeq(uvm_sequence):
@@ -162,7 +165,7 @@ class Scoreboard(uvm_component):
 class Monitor(uvm_component):
     def __init__(self, name, parent, method_name):
         super().__init__(name, parent)
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
         self.get_method = getattr(self.bfm, method_name)
 
     def build_phase(self):
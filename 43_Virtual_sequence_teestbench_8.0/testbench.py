@@ -8,7 +8,10 @@ import pyuvm
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path("..").resolve()))
-from tinyalu_utils import TinyAluBfm, Ops, alu_prediction  # noqa: E402
+from tinyalu_utils import get_bfm, Ops, alu_prediction  # noqa: E402
+from tinyalu_uvm import AluSeqItem, ReplaySeq, StreamingScoreboard, \
+    TaggedScoreboard, CrossCoverage, CoverageSeq  # noqa: E402
+from tinyalu_record import read_records  # noqa: E402
 
 
 # # Virtual sequence testbench: 8.0
@@ -114,23 +117,6 @@ class FibonacciSeq(uvm_sequence):
         uvm_root().logger.info("Fibonacci Sequence: " + str(fib_list))
 
 
-class AluSeqItem(uvm_sequence_item):
-
-    def __init__(self, name, aa, bb, op):
-        super().__init__(name)
-        self.A = aa
-        self.B = bb
-        self.op = Ops(op)
-
-    def __eq__(self, other):
-        same = self.A == other.A and self.B == other.B and self.op == other.op
-        return same
-
-    def __str__(self):
-        return f"{self.get_name()} : A: 0x{self.A:02x} \
-        OP: {self.op.name} ({self.op.value}) B: 0x{self.B:02x}"
-
-
 class BaseSeq(uvm_sequence):
 
     async def body(self):
@@ -161,7 +147,7 @@ class Driver(uvm_driver):
         self.ap = uvm_analysis_port("ap", self)
 
     def start_of_simulation_phase(self):
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
 
     async def launch_tb(self):
         await self.bfm.reset()
@@ -177,6 +163,9 @@ class Driver(uvm_driver):
             cmd.result = result
             self.seq_item_port.item_done()
 
+    def report_phase(self):
+        self.bfm.log_queue_stats()
+
 
 class Coverage(uvm_subscriber):
 
@@ -239,7 +228,7 @@ class Scoreboard(uvm_component):
 class Monitor(uvm_component):
     def __init__(self, name, parent, method_name):
         super().__init__(name, parent)
-        self.bfm = TinyAluBfm()
+        self.bfm = get_bfm(self)
         self.get_method = getattr(self.bfm, method_name)
 
     def build_phase(self):
@@ -260,12 +249,15 @@ class AluEnv(uvm_env):
         self.driver = Driver.create("driver", self)
         self.cmd_mon = Monitor("cmd_mon", self, "get_cmd")
         self.coverage = Coverage("coverage", self)
-        self.scoreboard = Scoreboard("scoreboard", self)
+        self.cross_coverage = CrossCoverage("cross_coverage", self)
+        ConfigDB().set(None, "*", "CROSS_COVERAGE", self.cross_coverage)
+        self.scoreboard = Scoreboard.create("scoreboard", self)
 
     def connect_phase(self):
         self.driver.seq_item_port.connect(self.seqr.seq_item_export)
         self.cmd_mon.ap.connect(self.scoreboard.cmd_export)
         self.cmd_mon.ap.connect(self.coverage.analysis_export)
+        self.cmd_mon.ap.connect(self.cross_coverage.analysis_export)
         self.driver.ap.connect(self.scoreboard.result_export)
 
 
@@ -284,3 +276,130 @@ class FibonacciTest(AluTest):
         self.env.set_logging_level_hier(CRITICAL)
         uvm_factory().set_type_override_by_type(TestAllSeq, FibonacciSeq)
         return super().end_of_elaboration_phase()
+
+
+# Running the same sequences at transaction level with
+# the golden-model BFM instead of the TinyALU pins
+@pyuvm.test()
+class TlmTest(AluTest):
+    def build_phase(self):
+        uvm_factory().set_type_override_by_name("TinyAluBfm", "TinyAluTlmBfm")
+        super().build_phase()
+
+
+# Replaying a recorded transaction file, for example
+# make PLUSARGS="+REPLAY_FILE=transactions.bin +REPLAY_START=1000"
+class ReplayAllSeq(uvm_sequence):
+    async def body(self):
+        seqr = ConfigDB().get(None, "", "SEQR")
+        await ReplaySeq("replay").start(seqr)
+
+
+@pyuvm.test(skip="REPLAY_FILE" not in cocotb.plusargs)
+class ReplayTest(AluTest):
+    def build_phase(self):
+        ConfigDB().set(None, "*", "REPLAY_FILE", cocotb.plusargs["REPLAY_FILE"])
+        ConfigDB().set(None, "*", "REPLAY_START",
+                       int(cocotb.plusargs.get("REPLAY_START", 0)))
+        ConfigDB().set(None, "*", "DISABLE_COVERAGE_ERRORS", True)
+        super().build_phase()
+
+    def end_of_elaboration_phase(self):
+        uvm_factory().set_type_override_by_type(TestAllSeq, ReplayAllSeq)
+        return super().end_of_elaboration_phase()
+
+
+# Recording a run and replaying the file it wrote
+@pyuvm.test()
+class RecordReplayTest(AluTest):
+    async def run_phase(self):
+        self.raise_objection()
+        bfm = get_bfm(self)
+        bfm.start_recording("transactions.bin")
+        await self.test_all.start()
+        bfm.stop_recording()
+        ConfigDB().set(None, "*", "REPLAY_FILE", "transactions.bin")
+        bfm.start_recording("replay.bin")
+        await ReplayAllSeq("replay_all").start()
+        bfm.stop_recording()
+        recorded = [record[1:] for record in read_records("transactions.bin")]
+        replayed = [record[1:] for record in read_records("replay.bin")]
+        assert len(recorded) == 2 * len(Ops), \
+            f"Recorded {len(recorded)} transactions"
+        assert replayed == recorded, "The replay differs from the recording"
+        self.drop_objection()
+
+
+# Checking each result as it arrives instead of in check_phase()
+@pyuvm.test()
+class StreamingTest(AluTest):
+    def build_phase(self):
+        uvm_factory().set_type_override_by_type(Scoreboard, StreamingScoreboard)
+        super().build_phase()
+
+
+# Tagging each command and result so the scoreboard can match
+# them in any order. The TinyALU answers in command order, so the
+# nth command cmd_mon sees and the nth result share the tag
+# (env name, n). The env name keeps the tags unique when the envs
+# for several TinyALUs feed one TaggedScoreboard.
+class CmdTagger(uvm_subscriber):
+    def build_phase(self):
+        self.ap = uvm_analysis_port("ap", self)
+        self.env_name = self.get_parent().get_full_name()
+        self.count = 0
+
+    def write(self, cmd):
+        self.ap.write(((self.env_name, self.count), cmd))
+        self.count += 1
+
+
+class TaggedDriver(Driver):
+    async def run_phase(self):
+        await self.launch_tb()
+        env_name = self.get_parent().get_full_name()
+        count = 0
+        while True:
+            cmd = await self.seq_item_port.get_next_item()
+            await self.bfm.send_op(cmd.A, cmd.B, cmd.op)
+            result = await self.bfm.get_result()
+            self.ap.write(((env_name, count), result))
+            count += 1
+            cmd.result = result
+            self.seq_item_port.item_done()
+
+
+class TaggedAluEnv(AluEnv):
+    def build_phase(self):
+        uvm_factory().set_type_override_by_type(Driver, TaggedDriver)
+        uvm_factory().set_type_override_by_type(Scoreboard, TaggedScoreboard)
+        super().build_phase()
+        self.cmd_tagger = CmdTagger("cmd_tagger", self)
+
+    def connect_phase(self):
+        self.driver.seq_item_port.connect(self.seqr.seq_item_export)
+        self.cmd_mon.ap.connect(self.coverage.analysis_export)
+        self.cmd_mon.ap.connect(self.cross_coverage.analysis_export)
+        self.cmd_mon.ap.connect(self.cmd_tagger.analysis_export)
+        self.cmd_tagger.ap.connect(self.scoreboard.cmd_export)
+        self.driver.ap.connect(self.scoreboard.result_export)
+
+
+@pyuvm.test()
+class TaggedTest(AluTest):
+    def build_phase(self):
+        self.env = TaggedAluEnv("env", self)
+
+
+# Sending random commands until cross coverage closes
+class CoverageAllSeq(uvm_sequence):
+    async def body(self):
+        seqr = ConfigDB().get(None, "", "SEQR")
+        await CoverageSeq("coverage").start(seqr)
+
+
+@pyuvm.test()
+class CoverageTest(AluTest):
+    def end_of_elaboration_phase(self):
+        uvm_factory().set_type_override_by_type(TestAllSeq, CoverageAllSeq)
+        return super().end_of_elaboration_phase()
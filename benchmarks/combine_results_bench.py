@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Time combine_results.merge_results() on synthetic results.xml
+trees at growing scales, against the original scan of every
+merged testsuite.
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from xml.etree import ElementTree as ET
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from combine_results import find_all, merge_results  # noqa: E402
+
+
+def write_results(directory, file_count, testcases=5):
+    """Write file_count results.xml files, each with its own
+    testsuite and a share of one common testsuite"""
+    for number in range(file_count):
+        run_dir = Path(directory) / f"run{number}"
+        run_dir.mkdir()
+        result = ET.Element("testsuites", name="results")
+        for (name, package) in ((f"suite{number}", f"run{number}"),
+                                ("all", "all")):
+            ts = ET.SubElement(result, "testsuite", name=name, package=package)
+            for case in range(testcases):
+                ET.SubElement(ts, "testcase", name=f"test{case}",
+                              classname="testbench", file="testbench.py",
+                              lineno="1", time="0.1")
+        ET.ElementTree(result).write(run_dir / "results.xml", encoding="UTF-8")
+
+
+def scan_results(fnames, testsuites_name):
+    """The original merge, which scans result for every testsuite"""
+    result = ET.Element("testsuites", name=testsuites_name)
+    for fname in fnames:
+        tree = ET.parse(fname)
+        for ts in tree.iter("testsuite"):
+            use_element = None
+            for existing in result:
+                if existing.get('name') == ts.get('name') and existing.get('package') == ts.get('package'):
+                    use_element = existing
+                    break
+            if use_element is None:
+                result.append(ts)
+            else:
+                use_element.extend(list(ts))
+    return result
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--base_files", dest="base_files", type=int, required=False,
+                        default=4,
+                        help="results.xml files at 1x scale")
+    parser.add_argument("--scales", dest="scales", type=int, nargs="+", required=False,
+                        default=[10, 100, 1000],
+                        help="Multiples of base_files to time")
+    parser.add_argument("--skip_scan", dest="scan", action='store_const', required=False,
+                        const=False, default=True,
+                        help="Only time merge_results()")
+
+    return parser
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        file_count = args.base_files * scale
+        with tempfile.TemporaryDirectory() as directory:
+            write_results(directory, file_count)
+            fnames = list(find_all("results.xml", directory))
+            start = time.perf_counter()
+            result = merge_results(fnames, "results")
+            index_time = time.perf_counter() - start
+            line = ("%5dx %6d files %6d testsuites  index: %7.3fs (%5.1f us/file)"
+                    % (scale, file_count, len(result), index_time,
+                       index_time / file_count * 1e6))
+            if args.scan:
+                start = time.perf_counter()
+                scanned = scan_results(fnames, "results")
+                scan_time = time.perf_counter() - start
+                assert ET.tostring(scanned) == ET.tostring(result), \
+                    "merge_results() does not match the original merge"
+                line += "  scan: %7.3fs" % scan_time
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    rc = main()
+    sys.exit(rc)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Time get_int() against SignalReader.get() on resolvable
+and X/Z signal values without running a simulator.
+"""
+
+import sys
+import timeit
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tinyalu_utils import SignalReader, get_int  # noqa: E402
+try:
+    from cocotb.binary import BinaryValue as SignalValue
+except ImportError:
+    from cocotb.types import LogicArray as SignalValue
+
+
+class Signal:
+    """Stands in for a simulator handle holding a fixed value"""
+    __slots__ = ("value",)
+
+    def __init__(self, bits):
+        self.value = SignalValue(bits)
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--number", dest="number", type=int, required=False,
+                        default=200000,
+                        help="Reads per measurement")
+
+    return parser
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+
+    for label, bits in (("resolvable", "0000000010101010"),
+                        ("X/Z", "xxxxxxxxxxxxxxxx")):
+        signal = Signal(bits)
+        reader = SignalReader(signal, count_xz=True)
+        assert reader.get() == get_int(signal)
+        get_int_time = timeit.timeit(lambda: get_int(signal),
+                                     number=args.number)
+        reader_time = timeit.timeit(reader.get, number=args.number)
+        print("%-10s get_int: %6.3f us  SignalReader.get: %6.3f us  (%.1fx)"
+              % (label, get_int_time / args.number * 1e6,
+                 reader_time / args.number * 1e6, get_int_time / reader_time))
+    return 0
+
+
+if __name__ == "__main__":
+    rc = main()
+    sys.exit(rc)
@@ -0,0 +1,624 @@
+import cocotb
+from cocotb.queue import Queue, QueueFull
+from cocotb.triggers import ClockCycles, FallingEdge
+from cocotb.utils import get_sim_time
+import itertools
+import random
+import tempfile
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+# All testbenches use tinyalu_utils, so store it in a central
+# place and add its path to the sys path so we can import it
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path("..").resolve()))
+from pyuvm import ConfigDB, uvm_component  # noqa: E402
+from tinyalu_utils import BaseTinyAluBfm, Ops, alu_prediction, \
+    alu_prediction_batch, PredictionTable, RingBuffer, TinyAluBfmRegistry, \
+    InstrumentedQueue, RecordingQueue, get_bfm, logger, np  # noqa: E402
+from tinyalu_model import TinyAluModel, clock_models, reset_model, \
+    run_commands, start_cross_check  # noqa: E402
+from tinyalu_record import read_records, read_records_array  # noqa: E402
+from tinyalu_uvm import CrossCoverage, TaggedScoreboard, read_commands  # noqa: E402
+
+
+# # Golden model and BFM benchmarks
+# Every test checks that the fast path gives the same answers
+# as the original code before it reports how long each one took.
+
+def all_alu_inputs():
+    """Every (A, B, op) combination the TinyALU accepts"""
+    return list(itertools.product(range(256), range(256), list(Ops)))
+
+
+# ## Batched alu_prediction()
+@cocotb.test()
+async def test_batch_prediction(_):
+    """alu_prediction_batch() matches alu_prediction() on every input"""
+    inputs = all_alu_inputs()
+    aa_list, bb_list, op_list = (list(col) for col in zip(*inputs))
+
+    start = time.perf_counter()
+    scalar = [alu_prediction(aa, bb, op) for (aa, bb, op) in inputs]
+    scalar_time = time.perf_counter() - start
+
+    arrays = (array("B", aa_list), array("B", bb_list), array("B", op_list))
+    start = time.perf_counter()
+    batch = alu_prediction_batch(*arrays)
+    array_time = time.perf_counter() - start
+    assert list(batch) == scalar, "array.array batch does not match"
+    logger.info(f"alu_prediction: {scalar_time:.3f}s  "
+                f"array batch: {array_time:.3f}s")
+
+    if np is not None:
+        arrays = [np.array(col, dtype=np.uint8)
+                  for col in (aa_list, bb_list, op_list)]
+        start = time.perf_counter()
+        batch = alu_prediction_batch(*arrays)
+        numpy_time = time.perf_counter() - start
+        assert batch.tolist() == scalar, "NumPy batch does not match"
+        logger.info(f"NumPy batch: {numpy_time:.3f}s")
+
+
+# ## The memory-mapped prediction table
+@cocotb.test()
+async def test_prediction_table(_):
+    """PredictionTable matches alu_prediction() on every input"""
+    inputs = all_alu_inputs()
+    table = PredictionTable()
+
+    start = time.perf_counter()
+    looked_up = [table[cmd] for cmd in inputs]
+    table_time = time.perf_counter() - start
+    assert looked_up == [alu_prediction(*cmd) for cmd in inputs], \
+        "The prediction table does not match alu_prediction()"
+    logger.info(f"PredictionTable lookups: {table_time:.3f}s")
+
+    if np is not None:
+        aa, bb, op = (np.array(col) for col in zip(*inputs))
+        start = time.perf_counter()
+        batch = table.predict_batch(aa, bb, op)
+        logger.info(f"PredictionTable batch: {time.perf_counter() - start:.3f}s")
+        assert batch.tolist() == looked_up, "predict_batch() does not match"
+
+
+# ## Back-to-back command issue
+def default_bfm():
+    """A new BFM for cocotb.top in its default modes"""
+    return BaseTinyAluBfm(cocotb.top)
+
+
+async def clock_period(dut):
+    """Simulation time between two falling clock edges"""
+    await FallingEdge(dut.clk)
+    first_edge = get_sim_time()
+    await FallingEdge(dut.clk)
+    return get_sim_time() - first_edge
+
+
+async def cycles_per_op(bfm, op, count=100):
+    """Average clock cycles per op when sending count ops back to back"""
+    period = await clock_period(bfm.dut)
+
+    async def send_ops():
+        for _ in range(count):
+            await bfm.send_op(random.randint(0, 255),
+                              random.randint(0, 255), op)
+
+    start_time = get_sim_time()
+    cocotb.start_soon(send_ops())
+    for _ in range(count):
+        (aa, bb, _) = await bfm.get_cmd()
+        result = await bfm.get_result()
+        assert result == alu_prediction(aa, bb, op), \
+            f"{aa:02x} {op.name} {bb:02x} = {result:04x}"
+    return (get_sim_time() - start_time) / period / count
+
+
+# Cycles per op for each driver mode
+measured_cycles = {}
+
+
+async def report_cycles_per_op(bfm, mode):
+    await bfm.reset()
+    tasks = [cocotb.start_soon(coroutine) for coroutine in bfm.coroutines()]
+    measured_cycles[mode] = {}
+    for op in Ops:
+        cycles = await cycles_per_op(bfm, op)
+        measured_cycles[mode][op] = cycles
+        logger.info(f"{mode} {op.name}: {cycles:.2f} cycles per op")
+    for task in tasks:
+        task.cancel()
+
+
+@cocotb.test()
+async def test_cycles_per_op(_):
+    """Cycles per op with the default cmd_driver()"""
+    await report_cycles_per_op(default_bfm(), "cmd_driver")
+
+
+@cocotb.test()
+async def test_backlog_cycles_per_op(_):
+    """A deeper command queue does not change the cycles per op"""
+    if "cmd_driver" not in measured_cycles:
+        await report_cycles_per_op(default_bfm(), "cmd_driver")
+    bfm = default_bfm()
+    bfm.set_cmd_backlog(backlog=16)
+    await report_cycles_per_op(bfm, "backlog 16")
+    for op in Ops:
+        (queued, default) = (measured_cycles["backlog 16"][op], measured_cycles["cmd_driver"][op])
+        assert abs(queued - default) < 0.05, \
+            f"{op.name}: {queued:.2f} cycles with a backlog, {default:.2f} without"
+
+
+# ## Edge-triggered monitors
+class WakeupCounter:
+    """Starts the BFM coroutines and counts how often each resumes
+
+    Each coroutine runs inside a wrapper that passes its triggers
+    to the scheduler, so the counts cost the BFM nothing. Call
+    stop_tasks() at the end of a stream so that another BFM can
+    drive the TinyALU later in the same test.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.tasks = []
+
+    async def counted(self, coroutine):
+        value = None
+        while True:
+            try:
+                trigger = coroutine.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value = await trigger
+            self.counts[coroutine.__name__] += 1
+
+    def start_tasks(self, bfm):
+        self.tasks = [cocotb.start_soon(self.counted(coroutine))
+                      for coroutine in bfm.coroutines()]
+
+    def stop_tasks(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def reset(self):
+        self.counts.clear()
+
+    def total(self):
+        return sum(self.counts.values())
+
+
+# The command and result streams seen by each monitor mode
+monitored_streams = {}
+
+
+async def monitor_stream(bfm, mode, count=200):
+    """Send a fixed random stream and record what the monitors saw"""
+    await bfm.reset()
+    wakeups = WakeupCounter()
+    wakeups.start_tasks(bfm)
+    rng = random.Random(count)
+
+    async def send_ops():
+        for _ in range(count):
+            await bfm.send_op(rng.randint(0, 255), rng.randint(0, 255),
+                              rng.choice(list(Ops)))
+
+    wall_start = time.perf_counter()
+    wakeups.reset()
+    cocotb.start_soon(send_ops())
+    cmds = []
+    results = []
+    for _ in range(count):
+        cmds.append(await bfm.get_cmd())
+        results.append(await bfm.get_result())
+    wall_time = time.perf_counter() - wall_start
+    wakeups.stop_tasks()
+    logger.info(f"{mode}: {wakeups.total() / count:.2f} BFM wake-ups "
+                f"per transaction, {wall_time:.3f}s")
+    monitored_streams[mode] = (cmds, results)
+
+
+async def polling_stream():
+    """The stream seen by the polling monitors, which every other
+    mode must match. Runs it here if test_polling_monitors has not,
+    so each test can run alone under COCOTB_TEST_FILTER."""
+    if "polling monitors" not in monitored_streams:
+        await monitor_stream(default_bfm(), "polling monitors")
+    return monitored_streams["polling monitors"]
+
+
+@cocotb.test()
+async def test_polling_monitors(_):
+    """Monitor wake-ups per transaction with cmd_mon() and result_mon()"""
+    await monitor_stream(default_bfm(), "polling monitors")
+
+
+@cocotb.test()
+async def test_edge_monitors(_):
+    """Edge-triggered monitors see the same stream with fewer wake-ups"""
+    reference = await polling_stream()
+    bfm = default_bfm()
+    bfm.set_edge_monitor_mode()
+    await monitor_stream(bfm, "edge monitors")
+    assert monitored_streams["edge monitors"] == reference, \
+        "Edge-triggered monitors saw a different stream"
+
+
+# ## One sampler for the driver and monitors
+@cocotb.test()
+async def test_sampler(_):
+    """sampler() sees the same stream as the separate coroutines"""
+    reference = await polling_stream()
+    bfm = default_bfm()
+    bfm.set_sampled_mode()
+    await monitor_stream(bfm, "sampler")
+    assert monitored_streams["sampler"] == reference, \
+        "sampler() saw a different stream"
+
+
+# ## Sleeping on the command queue
+# The times at which each driver's commands and results appeared
+pin_timing = {}
+
+
+async def sparse_stream(bfm, mode, count=20, gap=100):
+    """Send commands gap clocks apart and record when the
+    monitors saw each command and result"""
+    await bfm.reset()
+    wakeups = WakeupCounter()
+    wakeups.start_tasks(bfm)
+    start_time = get_sim_time()
+    rng = random.Random(count)
+
+    async def send_ops():
+        for _ in range(count):
+            await ClockCycles(bfm.dut.clk, gap)
+            await bfm.send_op(rng.randint(0, 255), rng.randint(0, 255),
+                              rng.choice(list(Ops)))
+
+    wakeups.reset()
+    cocotb.start_soon(send_ops())
+    timing = []
+    for _ in range(count):
+        cmd = await bfm.get_cmd()
+        cmd_time = get_sim_time() - start_time
+        result = await bfm.get_result()
+        timing.append((cmd, cmd_time, result, get_sim_time() - start_time))
+    wakeups.stop_tasks()
+    driver_wakeups = sum(wakeups.counts[name] for name in ("cmd_driver", "idle_cmd_driver"))
+    logger.info(f"{mode}: {driver_wakeups / count:.2f} driver wake-ups "
+                f"per transaction")
+    pin_timing[mode] = timing
+
+
+@cocotb.test()
+async def test_polling_driver(_):
+    """Driver wake-ups per transaction with cmd_driver()"""
+    await sparse_stream(default_bfm(), "cmd_driver")
+
+
+@cocotb.test()
+async def test_idle_driver(_):
+    """idle_cmd_driver() keeps the pin timing with fewer wake-ups"""
+    if "cmd_driver" not in pin_timing:
+        await sparse_stream(default_bfm(), "cmd_driver")
+    bfm = default_bfm()
+    bfm.set_idle_mode()
+    await sparse_stream(bfm, "idle_cmd_driver")
+    assert pin_timing["idle_cmd_driver"] == pin_timing["cmd_driver"], \
+        "idle_cmd_driver() changed the pin timing"
+
+
+# ## The cycle-accurate Python model
+@cocotb.test()
+async def test_model_speed(_):
+    """The BFM drives the Python model without a simulator"""
+    rng = random.Random(1)
+    commands = [(rng.randint(0, 255), rng.randint(0, 255), rng.choice(list(Ops)))
+                for _ in range(100000)]
+    start = time.perf_counter()
+    cmds, results = run_commands(commands)
+    model_time = time.perf_counter() - start
+    assert cmds == [(aa, bb, int(op)) for (aa, bb, op) in commands]
+    assert results == [alu_prediction(*cmd) for cmd in commands]
+    logger.info(f"Python model: {len(commands) / model_time:.0f} "
+                f"transactions per second")
+
+
+@cocotb.test()
+async def test_model_cross_check(dut):
+    """The Python model matches the HDL on every clock"""
+    model = start_cross_check(dut)
+    await monitor_stream(default_bfm(), "cross check")
+    assert not model.mismatches, f"{len(model.mismatches)} model mismatches"
+
+
+# ## Several TinyALUs
+def model_bfms(count, name="alu"):
+    """A TinyAluModel for each of count envs, with its BFM
+    stored for the env in the ConfigDB. Each test needs its own
+    name, as the models and envs are named name0, name0_env, ...
+
+    Returns the BFM that get_bfm() finds for a driver in each env.
+    """
+    bfms = []
+    for number in range(count):
+        model = TinyAluModel(f"{name}{number}")
+        env = uvm_component(f"{name}{number}_env", None)
+        ConfigDB().set(env, "*", "BFM",
+                       TinyAluBfmRegistry().get_bfm(model))
+        bfms.append(get_bfm(uvm_component("driver", env)))
+    for bfm in bfms:
+        bfm.cmd_driver_queue = Queue(maxsize=0)
+        reset_model(bfm.dut, bfm)
+    return bfms
+
+
+@cocotb.test()
+async def test_multiple_alus(_):
+    """Each TinyALU has its own BFM and queues"""
+    bfms = model_bfms(2)
+    assert bfms[0] is not bfms[1], "The envs share a BFM"
+    assert [bfm.dut._path for bfm in bfms] == ["alu0", "alu1"]
+    rng = random.Random(2)
+    commands = [[(rng.randint(0, 255), rng.randint(0, 255),
+                  rng.choice(list(Ops))) for _ in range(100)]
+                for _ in bfms]
+    for (bfm, bfm_commands) in zip(bfms, commands):
+        for cmd in bfm_commands:
+            bfm.cmd_driver_queue.put_nowait(cmd)
+    while any(bfm.result_mon_queue.qsize() < 100 for bfm in bfms):
+        clock_models(bfms)
+    for (bfm, bfm_commands) in zip(bfms, commands):
+        cmds = [bfm.cmd_mon_queue.get_nowait() for _ in bfm_commands]
+        results = [bfm.result_mon_queue.get_nowait() for _ in bfm_commands]
+        assert cmds == [(aa, bb, int(op)) for (aa, bb, op) in bfm_commands]
+        assert results == [alu_prediction(*cmd) for cmd in bfm_commands]
+        assert bfm.result_mon_queue.empty()
+
+
+# ## Matching results by tag
+@cocotb.test()
+async def test_tagged_scoreboard(_):
+    """TaggedScoreboard matches results that arrive in reverse order"""
+    scoreboard = TaggedScoreboard("reversed_scoreboard", None)
+    scoreboard.build_phase()
+    cmds = [(aa, 0xFF - aa, Ops.ADD) for aa in range(4)]
+    for (tag, cmd) in enumerate(cmds):
+        scoreboard.cmd_export.write((tag, cmd))
+    for tag in reversed(range(4)):
+        scoreboard.result_export.write((tag, alu_prediction(*cmds[tag])))
+    assert scoreboard.passed[Ops.ADD] == 4 and not scoreboard.failed
+    assert scoreboard.reorder_distances == Counter({3: 2, 1: 2})
+    assert not scoreboard.cmds and not scoreboard.results
+
+    # A reused tag fails the command it displaces
+    scoreboard.cmd_export.write((4, (1, 2, Ops.XOR)))
+    scoreboard.cmd_export.write((4, (1, 2, Ops.AND)))
+    scoreboard.result_export.write((4, alu_prediction(1, 2, Ops.AND)))
+    assert scoreboard.failed == Counter({Ops.XOR: 1})
+    assert scoreboard.passed[Ops.AND] == 1
+
+
+@cocotb.test()
+async def test_tagged_alus(_):
+    """One TaggedScoreboard checks two TinyALUs whose results
+    arrive out of command order"""
+    bfms = model_bfms(2, "tagged_alu")
+    scoreboard = TaggedScoreboard("alus_scoreboard", None)
+    scoreboard.build_phase()
+    rng = random.Random(3)
+    # The MULs on alu0 take longer than the ADDs on alu1
+    for (bfm, op) in zip(bfms, (Ops.MUL, Ops.ADD)):
+        for _ in range(20):
+            bfm.cmd_driver_queue.put_nowait(
+                (rng.randint(0, 255), rng.randint(0, 255), op))
+    counts = [[0, 0] for _ in bfms]
+    (cmd_tags, result_tags) = ([], [])
+    while sum(result_count for (_, result_count) in counts) < 40:
+        clock_models(bfms)
+        for (bfm, bfm_counts) in zip(bfms, counts):
+            while not bfm.cmd_mon_queue.empty():
+                tag = (bfm.dut._path, bfm_counts[0])
+                scoreboard.cmd_export.write((tag, bfm.cmd_mon_queue.get_nowait()))
+                cmd_tags.append(tag)
+                bfm_counts[0] += 1
+            while not bfm.result_mon_queue.empty():
+                tag = (bfm.dut._path, bfm_counts[1])
+                scoreboard.result_export.write((tag, bfm.result_mon_queue.get_nowait()))
+                result_tags.append(tag)
+                bfm_counts[1] += 1
+    assert scoreboard.passed == Counter({Ops.MUL: 20, Ops.ADD: 20})
+    assert not scoreboard.failed
+    assert not scoreboard.cmds and not scoreboard.results
+    distances = Counter(abs(number - cmd_tags.index(tag))
+                        for (number, tag) in enumerate(result_tags))
+    assert scoreboard.reorder_distances == distances
+    assert max(distances) > 0, "The results arrived in command order"
+    logger.info(f"Maximum reorder distance: {max(distances)}")
+
+
+# ## Array-backed monitor queues
+def queued_bytes(make_queue, count=100000):
+    """Bytes held by a queue built by make_queue() once it
+    holds count commands"""
+    tracemalloc.start()
+    queue = make_queue()
+    for ii in range(count):
+        queue.put_nowait((ii & 0xFF, (ii >> 8) & 0xFF, ii % 4 + 1))
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert queue.qsize() == count
+    return held
+
+
+@cocotb.test()
+async def test_ring_buffer(_):
+    """RingBuffer keeps order and holds rows in typed arrays"""
+    ring = RingBuffer({"A": "B", "B": "B", "op": "B"}, high_water=4096)
+    for ii in range(3000):
+        ring.put_nowait((ii & 0xFF, (ii >> 8) & 0xFF, ii % 4 + 1))
+    assert ring.get_nowait() == (0, 0, 1)
+    rows = ring.get_many(5000)
+    assert list(rows["A"]) == [ii & 0xFF for ii in range(1, 3000)]
+    assert ring.empty()
+    small_ring = RingBuffer({"result": "H"}, high_water=2)
+    small_ring.put_nowait(1)
+    small_ring.put_nowait(2)
+    try:
+        small_ring.put_nowait(3)
+    except QueueFull:
+        pass
+    else:
+        assert False, "A full RingBuffer accepted another row"
+    assert [small_ring.get_nowait() for _ in range(2)] == [1, 2]
+
+    queue_bytes = queued_bytes(lambda: Queue(maxsize=0))
+    ring_bytes = queued_bytes(lambda: RingBuffer(
+        {"A": "B", "B": "B", "op": "B"}, high_water=100000))
+    logger.info(f"Memory holding 100000 commands: Queue {queue_bytes} "
+                f"bytes, RingBuffer {ring_bytes} bytes")
+
+
+# ## Queue instrumentation
+@cocotb.test()
+async def test_queue_instrumentation(_):
+    """Report queue occupancy and waits for a random stream"""
+    reference = await polling_stream()
+    bfm = default_bfm()
+    bfm.set_queue_instrumentation()
+    await monitor_stream(bfm, "instrumented queues")
+    assert monitored_streams["instrumented queues"] == reference, \
+        "Instrumenting the queues changed the stream"
+    bfm.log_queue_stats()
+
+
+# ## Recording transactions
+@cocotb.test()
+async def test_recorder(_):
+    """The recorded file holds the monitored stream"""
+    bfm = default_bfm()
+    bfm.start_recording("transactions.bin")
+    await monitor_stream(bfm, "recorded")
+    bfm.stop_recording()
+    (cmds, results) = monitored_streams["recorded"]
+    records = list(read_records("transactions.bin"))
+    assert [record[1:4] for record in records] == cmds
+    assert [record[4] for record in records] == results
+    if np is not None:
+        array_records = read_records_array("transactions.bin")
+        assert array_records["result"].tolist() == results
+
+    # Stopping unwraps only the recorder from later wrappers
+    with tempfile.TemporaryDirectory() as directory:
+        bfm.start_recording(Path(directory) / "transactions.bin")
+        bfm.set_queue_instrumentation()
+        bfm.stop_recording()
+    for queue in (bfm.cmd_mon_queue, bfm.result_mon_queue):
+        assert isinstance(queue, InstrumentedQueue)
+        assert not isinstance(queue.queue, RecordingQueue)
+
+
+@cocotb.test()
+async def test_read_csv_commands(_):
+    """read_commands() parses hex and decimal CSV operands and
+    rejects malformed rows"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "commands.csv"
+        path.write_text("A,B,op\n0xff,08,1\n\n3,0x04,4\n")
+        assert list(read_commands(path)) == [(0xFF, 8, 1), (3, 4, 4)]
+        assert list(read_commands(path, 1)) == [(3, 4, 4)]
+        for bad_rows in ("1,2,3\nA,B,op\n", "1,2\n3,4,1\n", "1,256,1\n", "1,2,5\n"):
+            path.write_text(bad_rows)
+            try:
+                list(read_commands(path))
+            except ValueError:
+                continue
+            assert False, f"read_commands() accepted {bad_rows!r}"
+
+
+# ## Cross coverage
+@cocotb.test()
+async def test_cross_coverage(_):
+    """write() and write_many() fill every bin with every input"""
+    inputs = all_alu_inputs()
+    coverage = CrossCoverage("cross_coverage", None)
+    coverage.build_phase()
+    start = time.perf_counter()
+    for cmd in inputs:
+        coverage.write(cmd)
+    write_time = time.perf_counter() - start
+    assert not coverage.holes(), "All the inputs left coverage holes"
+
+    batch_coverage = CrossCoverage("batch_coverage", None)
+    batch_coverage.build_phase()
+    aa_list, bb_list, op_list = (list(col) for col in zip(*inputs))
+    start = time.perf_counter()
+    batch_coverage.write_many(aa_list, bb_list, op_list)
+    batch_time = time.perf_counter() - start
+    assert batch_coverage.counts == coverage.counts, \
+        "write_many() does not match write()"
+
+    # An op that read as X/Z is 0, which must not count as ADD
+    counts = array("Q", coverage.counts)
+    for cmd in ((0, 0, 0), (0xFF, 0xFF, 7)):
+        coverage.write(cmd)
+    batch_coverage.write_many([0, 0xFF], [0, 0xFF], [0, 7])
+    assert coverage.counts == batch_coverage.counts == counts, \
+        "Commands outside Ops changed the coverage"
+    assert coverage.illegal_ops == batch_coverage.illegal_ops == 2
+
+    cvg = set()
+    start = time.perf_counter()
+    for (_, _, op) in inputs:
+        cvg.add(op)
+    set_time = time.perf_counter() - start
+    logger.info(f"{len(inputs)} commands: set coverage {set_time:.3f}s  "
+                f"cross coverage write() {write_time:.3f}s  "
+                f"write_many() {batch_time:.3f}s")
+
+
+@cocotb.test()
+async def test_operand_bins(_):
+    """An "other" bin only for leftover values, and no empty bins"""
+    halves = {"low": range(0x80), "high": range(0x80, 0x100)}
+    ConfigDB().set(None, "halves_coverage", "OPERAND_BINS", halves)
+    coverage = CrossCoverage("halves_coverage", None)
+    coverage.build_phase()
+    assert coverage.operand_bin_names == ["low", "high"], \
+        "Bins that cover every value got an other bin"
+    coverage = CrossCoverage("default_coverage", None)
+    coverage.build_phase()
+    assert coverage.operand_bin_names[-1] == "other"
+
+    shadowed = {"low": range(0x80), "zero": (0x00,)}
+    ConfigDB().set(None, "shadowed_coverage", "OPERAND_BINS", shadowed)
+    try:
+        CrossCoverage("shadowed_coverage", None).build_phase()
+    except AssertionError:
+        pass
+    else:
+        assert False, "A bin with no values of its own was accepted"
+
+
+@cocotb.test()
+async def test_random_cmd(_):
+    """random_cmd() hits every hole with custom OPERAND_BINS"""
+    operand_bins = {"zero": (0x00,), "small": range(0x01, 0x10),
+                    "large": range(0x10, 0x100)}
+    ConfigDB().set(None, "custom_coverage", "OPERAND_BINS", operand_bins)
+    coverage = CrossCoverage("custom_coverage", None)
+    coverage.build_phase()
+    assert coverage.operand_bin_names == list(operand_bins)
+    for bin_id in coverage.holes():
+        cmd = coverage.random_cmd(bin_id)
+        counts = array("Q", coverage.counts)
+        coverage.write(cmd)
+        assert coverage.counts[bin_id] == counts[bin_id] + 1, \
+            f"random_cmd() missed bin {coverage.bin_name(bin_id)} with {cmd}"
+    assert not coverage.holes(), "random_cmd() left coverage holes"
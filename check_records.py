@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Check a recorded TinyALU transaction file against the
+golden model in parallel, the way the Scoreboard's
+check_phase() does during a simulation.
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from tinyalu_record import read_records, read_records_array, record_count
+from tinyalu_golden import Ops, alu_prediction, alu_prediction_batch, np
+
+
+def check_chunk(path, first, count):
+    """Check count records starting at record first
+
+    Returns the number that passed and a list of
+    (record number, A, B, op, actual, predicted) mismatches.
+    predicted is None for an illegal op.
+    """
+    failures = []
+    if np is not None:
+        records = read_records_array(path)[first:first + count]
+        legal = np.isin(records["op"], list(Ops))
+        predicted = np.zeros(len(records), dtype=np.uint32)
+        predicted[legal] = alu_prediction_batch(
+            records["A"][legal], records["B"][legal], records["op"][legal])
+        for index in np.flatnonzero(~legal | (predicted != records["result"])):
+            (_, A, B, op, actual) = records[index].tolist()
+            failures.append((first + int(index), A, B, op, actual,
+                             int(predicted[index]) if legal[index] else None))
+    else:
+        for (index, (_, A, B, op, actual)) in enumerate(
+                read_records(path, first, count), start=first):
+            prediction = alu_prediction(A, B, Ops(op)) if op in set(Ops) else None
+            if prediction != actual:
+                failures.append((index, A, B, op, actual, prediction))
+    return count - len(failures), failures
+
+
+def failure_message(failure):
+    """The Scoreboard's FAILED line for a mismatch"""
+    (_, A, B, op, actual, predicted) = failure
+    if predicted is None:
+        return f"FAILED: 0x{A:02x} illegal op {op} 0x{B:02x} = 0x{actual:04x}"
+    return (f"FAILED: 0x{A:02x} {Ops(op).name} 0x{B:02x} "
+            f"= 0x{actual:04x} expected 0x{predicted:04x}")
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--record_file", dest="record_file", type=str, required=False,
+                        default="transactions.bin",
+                        help="Name of the recorded transaction file")
+    parser.add_argument("--jobs", dest="jobs", type=int, required=False,
+                        default=os.cpu_count(),
+                        help="Number of checker processes")
+    parser.add_argument("--chunk_records", dest="chunk_records", type=int, required=False,
+                        default=1 << 20,
+                        help="Records checked by each task")
+    parser.add_argument("--suppress_rc", dest="set_rc", action='store_const', required=False,
+                        const=False, default=True,
+                        help="Suppress return code if failures found")
+
+    return parser
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+
+    total = record_count(args.record_file)
+    starts = range(0, total, args.chunk_records)
+    counts = [min(args.chunk_records, total - first) for first in starts]
+    passed = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        # map() returns the chunks in order, so the mismatch
+        # list is in transaction order
+        for chunk_passed, chunk_failures in pool.map(
+                check_chunk, [args.record_file] * len(counts), starts, counts):
+            passed += chunk_passed
+            failures.extend(chunk_failures)
+
+    for failure in failures:
+        print("Transaction %d %s" % (failure[0], failure_message(failure)))
+    print("Checked %d transactions: %d PASSED, %d FAILED"
+          % (total, passed, len(failures)))
+    return 1 if failures and args.set_rc else 0
+
+
+if __name__ == "__main__":
+    rc = main()
+    sys.exit(rc)
@@ -9,4 +9,7 @@ cleanall: check clean
 	@rm -rf sim_build
 	@rm -rf modelsim.ini
 	@rm -rf transcript
+	@rm -rf transactions.bin
+	@rm -rf replay.bin
+	@rm -rf *.cov
 
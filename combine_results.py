@@ -7,6 +7,8 @@ every test simulation.
 import os
 import sys
 import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from xml.etree import ElementTree as ET
 
 
@@ -34,6 +36,12 @@ def get_parser():
     parser.add_argument("--verbose", dest="debug", action='store_const', required=False,
                         const=True, default=False,
                         help="Verbose/debug output")
+    parser.add_argument("--stream", dest="stream", action='store_const', required=False,
+                        const=True, default=False,
+                        help="Stream testcases through a temporary file to bound memory use")
+    parser.add_argument("--jobs", dest="jobs", type=int, required=False,
+                        default=1,
+                        help="Number of processes parsing results.xml files")
     parser.add_argument("--suppress_rc", dest="set_rc", action='store_const', required=False,
                         const=False, default=True,
                         help="Suppress return code if failures found")
@@ -41,33 +49,233 @@ def get_parser():
     return parser
 
 
-def main():
-
-    parser = get_parser()
-    args = parser.parse_args()
-    rc = 0
+def merge_results(fnames, testsuites_name, debug=False):
+    """Merge the testsuites in fnames into one testsuites element
 
-    result = ET.Element("testsuites", name=args.testsuites_name)
+    Testsuites with the same name and package are merged into the
+    first one found.
+    """
+    result = ET.Element("testsuites", name=testsuites_name)
+    # (name, package) -> the testsuite element in result
+    index = {}
 
-    for fname in find_all("results.xml", args.directory):
-        if args.debug:
+    for fname in fnames:
+        if debug:
             print("Reading file %s" % fname)
         tree = ET.parse(fname)
         for ts in tree.iter("testsuite"):
-            if args.debug:
+            if debug:
                 print("Ts name : {}, package : {}".format(ts.get('name'), ts.get('package')))
-            use_element = None
-            for existing in result:
-                if existing.get('name') == ts.get('name') and existing.get('package') == ts.get('package'):
-                    if args.debug:
-                        print("Already found")
-                    use_element = existing
-                    break
+            key = (ts.get('name'), ts.get('package'))
+            use_element = index.get(key)
             if use_element is None:
                 result.append(ts)
+                index[key] = ts
             else:
+                if debug:
+                    print("Already found")
                 # for tc in ts.getiterator("testcase"):
                 use_element.extend(list(ts))
+    return result
+
+
+def report_failure(testsuite, testcase):
+    """Print a failure in testcase
+
+    testsuite and testcase are elements or their attribute dicts.
+    """
+    print("Failure in testsuite: '{}' classname: '{}' testcase: '{}' with parameters '{}'".format(testsuite.get('name'), testcase.get('classname'), testcase.get('name'), testsuite.get('package')))
+    if os.getenv('GITHUB_ACTIONS') is not None:
+        # Get test file relative to root of repo
+        repo_root = os.path.commonprefix([os.path.abspath(testcase.get('file')), os.path.abspath(__file__)])
+        relative_file = testcase.get('file').replace(repo_root, "")
+        print("::error file={2},line={3}::Test {0}:{1} failed".format(testcase.get('classname'), testcase.get('name'), relative_file, testcase.get('lineno')))
+
+
+def report_failures(testsuite, testcase):
+    """Print the failures in a testcase and return how many there were"""
+    count = 0
+    for failure in testcase.iter('failure'):
+        count += 1
+        report_failure(testsuite, testcase)
+    return count
+
+
+def split_element(element, has_children):
+    """Serialize element without its children, split around
+    the point where the children go"""
+    shell = ET.Element(element.tag, element.attrib)
+    shell.text = element.text
+    shell.tail = element.tail
+    text = ET.tostring(shell, encoding="unicode",
+                       short_empty_elements=not has_children)
+    if not has_children and not element.text:
+        return text, ""
+    split = text.rindex("</")
+    return text[:split], text[split:]
+
+
+def stream_results(fnames, output_file, testsuites_name, debug=False):
+    """Merge fnames into output_file without holding the testcases
+
+    Reads each file with iterparse and appends each child of a
+    testsuite to a temporary spool file as soon as it is parsed,
+    then writes the merged testsuites around the spooled children
+    in the same order as merge_results(). Failures are printed as
+    they are read.
+
+    Returns the testsuite, testcase, and failure counts.
+    """
+    # (name, package) -> [first testsuite element, [(spool offset, length)]]
+    index = {}
+    testcase_count = 0
+    failure_count = 0
+    with tempfile.TemporaryFile() as spool:
+        for fname in fnames:
+            if debug:
+                print("Reading file %s" % fname)
+            depth = 0
+            testsuite = None
+            for (event, element) in ET.iterparse(fname, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if testsuite is None and element.tag == "testsuite":
+                        testsuite = element
+                        suite_depth = depth
+                        key = (element.get('name'), element.get('package'))
+                        if debug:
+                            print("Ts name : {}, package : {}".format(*key))
+                        chunks = index.setdefault(key, [element, []])[1]
+                    continue
+                depth -= 1
+                if element is testsuite:
+                    testsuite = None
+                elif testsuite is None:
+                    if depth == 1:
+                        element.clear()
+                elif depth == suite_depth:
+                    # A child of the testsuite is complete, so spool it
+                    for testcase in element.iter('testcase'):
+                        testcase_count += 1
+                        failure_count += report_failures(testsuite, testcase)
+                    data = ET.tostring(element, encoding="utf-8")
+                    offset = spool.tell()
+                    spool.write(data)
+                    if chunks and sum(chunks[-1]) == offset:
+                        chunks[-1] = (chunks[-1][0], chunks[-1][1] + len(data))
+                    else:
+                        chunks.append((offset, len(data)))
+                    testsuite.remove(element)
+
+        with open(output_file, "wb") as output:
+            root = ET.Element("testsuites", name=testsuites_name)
+            (root_start, root_end) = split_element(root, bool(index))
+            output.write(root_start.encode())
+            for (testsuite, chunks) in index.values():
+                (start, end) = split_element(testsuite, bool(chunks))
+                output.write(start.encode())
+                for (offset, length) in chunks:
+                    spool.seek(offset)
+                    while length:
+                        data = spool.read(min(length, 1 << 20))
+                        output.write(data)
+                        length -= len(data)
+                output.write(end.encode())
+            output.write(root_end.encode())
+    return len(index), testcase_count, failure_count
+
+
+def summarize_results(fname):
+    """Parse fname into a picklable summary of its testsuites
+
+    Returns a list with each testsuite's (name, package) key,
+    attributes, text, and tail, its serialized children, and
+    the attributes and failure count of each of its testcases.
+    """
+    suites = []
+    for ts in ET.parse(fname).iter("testsuite"):
+        children = [ET.tostring(child, encoding="utf-8") for child in ts]
+        testcases = [(dict(tc.attrib), len(list(tc.iter('failure'))))
+                     for tc in ts.iter('testcase')]
+        suites.append(((ts.get('name'), ts.get('package')), dict(ts.attrib),
+                       ts.text, ts.tail, children, testcases))
+    return suites
+
+
+def parallel_results(fnames, output_file, testsuites_name, jobs, debug=False):
+    """Parse fnames in jobs processes and merge them in order
+
+    The merge, the failure report, and output_file match the
+    serial path, because map() returns the summaries in file
+    order and the testsuites merge by (name, package) as in
+    merge_results().
+
+    Returns the testsuite, testcase, and failure counts.
+    """
+    fnames = list(fnames)
+    # (name, package) -> [testsuite shell element, children, testcases]
+    index = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        summaries = pool.map(summarize_results, fnames,
+                             chunksize=max(1, len(fnames) // (jobs * 4)))
+        for (fname, suites) in zip(fnames, summaries):
+            if debug:
+                print("Read file %s" % fname)
+            for (key, attrib, text, tail, children, testcases) in suites:
+                if key not in index:
+                    shell = ET.Element("testsuite", attrib)
+                    shell.text = text
+                    shell.tail = tail
+                    index[key] = [shell, [], []]
+                index[key][1].extend(children)
+                index[key][2].extend(testcases)
+
+    testcase_count = 0
+    failure_count = 0
+    for (shell, _, testcases) in index.values():
+        for (testcase, failures) in testcases:
+            testcase_count += 1
+            for _ in range(failures):
+                report_failure(shell, testcase)
+            failure_count += failures
+
+    with open(output_file, "wb") as output:
+        root = ET.Element("testsuites", name=testsuites_name)
+        (root_start, root_end) = split_element(root, bool(index))
+        output.write(root_start.encode())
+        for (shell, children, _) in index.values():
+            (start, end) = split_element(shell, bool(children))
+            output.write(start.encode())
+            output.writelines(children)
+            output.write(end.encode())
+        output.write(root_end.encode())
+    return len(index), testcase_count, failure_count
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+    rc = 0
+
+    if args.stream and args.jobs > 1:
+        parser.error("--stream reads the files serially, so it cannot use --jobs")
+    if args.stream or args.jobs > 1:
+        if args.stream:
+            (testsuite_count, testcase_count, failure_count) = stream_results(
+                find_all("results.xml", args.directory), args.output_file,
+                args.testsuites_name, args.debug)
+        else:
+            (testsuite_count, testcase_count, failure_count) = parallel_results(
+                find_all("results.xml", args.directory), args.output_file,
+                args.testsuites_name, args.jobs, args.debug)
+        if failure_count and args.set_rc:
+            rc = 1
+        print("Ran a total of %d TestSuites and %d TestCases" % (testsuite_count, testcase_count))
+        return rc
+
+    result = merge_results(find_all("results.xml", args.directory),
+                           args.testsuites_name, args.debug)
 
     if args.debug:
         ET.dump(result)
@@ -78,15 +286,8 @@ def main():
         testsuite_count += 1
         for testcase in testsuite.iter('testcase'):
             testcase_count += 1
-            for failure in testcase.iter('failure'):
-                if args.set_rc:
-                    rc = 1
-                print("Failure in testsuite: '{}' classname: '{}' testcase: '{}' with parameters '{}'".format(testsuite.get('name'), testcase.get('classname'), testcase.get('name'), testsuite.get('package')))
-                if os.getenv('GITHUB_ACTIONS') is not None:
-                    # Get test file relative to root of repo
-                    repo_root = os.path.commonprefix([os.path.abspath(testcase.get('file')), os.path.abspath(__file__)])
-                    relative_file = testcase.get('file').replace(repo_root, "")
-                    print("::error file={2},line={3}::Test {0}:{1} failed".format(testcase.get('classname'), testcase.get('name'), relative_file, testcase.get('lineno')))
+            if report_failures(testsuite, testcase) and args.set_rc:
+                rc = 1
 
     print("Ran a total of %d TestSuites and %d TestCases" % (testsuite_count, testcase_count))
 
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Choose a small set of (test, seed) runs that hits every
+cross coverage bin the full regression hits, using the
+coverage databases that CrossCoverage writes.
+"""
+
+import os
+import sys
+import argparse
+from merge_coverage import find_coverage
+from tinyalu_coverage import read_coverage, run_name
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--directory", dest="directory", type=str, required=False,
+                        default=".",
+                        help="Name of base directory to search from")
+    parser.add_argument("--output_file", dest="output_file", type=str, required=False,
+                        default="reduced_regression.txt",
+                        help="Name of the file listing the make command for each chosen run")
+    parser.add_argument("--verbose", dest="debug", action='store_const', required=False,
+                        const=True, default=False,
+                        help="Verbose/debug output")
+
+    return parser
+
+
+def read_runs(fnames, debug=False):
+    """Return the bin names and a dict of run name to
+    (metadata, bitset of the bins the run hit)"""
+    bin_names = []
+    bin_index = {}
+    runs = {}
+    for fname in fnames:
+        (metadata, counts) = read_coverage(fname)
+        if "runs" in metadata:
+            if debug:
+                print("Skipping merged file %s" % fname)
+            continue
+        bits = 0
+        for (name, count) in zip(metadata["bins"], counts):
+            if name not in bin_index:
+                bin_index[name] = len(bin_names)
+                bin_names.append(name)
+            if count:
+                bits |= 1 << bin_index[name]
+        run = run_name(metadata)
+        (_, run_bits) = runs.get(run, (metadata, 0))
+        runs[run] = (metadata, run_bits | bits)
+    return bin_names, runs
+
+
+def greedy_cover(runs):
+    """Greedy set cover: repeatedly choose the run that hits
+    the most bins still missing. Ties go to the first run name."""
+    remaining = 0
+    for (_, bits) in runs.values():
+        remaining |= bits
+    chosen = []
+    names = sorted(runs)
+    while remaining:
+        (best, best_count) = (None, 0)
+        for run in names:
+            count = bin(runs[run][1] & remaining).count("1")
+            if count > best_count:
+                (best, best_count) = (run, count)
+        chosen.append(best)
+        remaining &= ~runs[best][1]
+    return chosen
+
+
+def make_command(metadata):
+    """The command that reruns a test with its seed"""
+    directory = os.path.relpath(metadata.get("directory", "."))
+    # The filter is a regular expression, so anchor the name
+    return ("make -C %s sim COCOTB_TEST_FILTER='\\b%s$' COCOTB_RANDOM_SEED=%s"
+            % (directory, metadata["test"], metadata["seed"]))
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+
+    fnames = list(find_coverage(".cov", args.directory))
+    (bin_names, runs) = read_runs(fnames, args.debug)
+    chosen = greedy_cover(runs)
+    hit = 0
+    for (_, bits) in runs.values():
+        hit |= bits
+
+    with open(args.output_file, "w") as output_file:
+        for run in chosen:
+            if args.debug:
+                print("Chose %s" % run)
+            output_file.write(make_command(runs[run][0]) + "\n")
+    print("Chose %d of %d runs to hit the same %d of %d bins"
+          % (len(chosen), len(runs), bin(hit).count("1"), len(bin_names)))
+    return 0
+
+
+if __name__ == "__main__":
+    rc = main()
+    sys.exit(rc)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+Build the table of every TinyALU result that
+tinyalu_golden.PredictionTable memory-maps.
+"""
+
+import sys
+import argparse
+from tinyalu_golden import PREDICTION_TABLE_PATH, write_prediction_table
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--output_file", dest="output_file", type=str, required=False,
+                        default=str(PREDICTION_TABLE_PATH),
+                        help="Name of the table file")
+
+    return parser
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+    write_prediction_table(args.output_file)
+    print("Wrote %s" % args.output_file)
+    return 0
+
+
+if __name__ == "__main__":
+    rc = main()
+    sys.exit(rc)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Merge the TinyALU coverage databases that CrossCoverage
+writes in every test, and report which runs hit each bin.
+"""
+
+import os
+import sys
+import csv
+import argparse
+from tinyalu_coverage import read_coverage, run_name, write_coverage
+
+
+def find_coverage(suffix, path):
+    for root, dirs, files in os.walk(path):
+        for name in sorted(files):
+            if name.endswith(suffix):
+                yield os.path.join(root, name)
+
+
+def get_parser():
+    """Return the cmdline parser"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--directory", dest="directory", type=str, required=False,
+                        default=".",
+                        help="Name of base directory to search from")
+    parser.add_argument("--output_file", dest="output_file", type=str, required=False,
+                        default="merged_coverage.cov",
+                        help="Name of the merged coverage file")
+    parser.add_argument("--report_file", dest="report_file", type=str, required=False,
+                        default=None,
+                        help="Name of a CSV file listing the hits and runs for each bin")
+    parser.add_argument("--include_merged", dest="include_merged", action='store_const', required=False,
+                        const=True, default=False,
+                        help="Also merge files written by this script, such as merges of other regressions")
+    parser.add_argument("--verbose", dest="debug", action='store_const', required=False,
+                        const=True, default=False,
+                        help="Verbose/debug output")
+    parser.add_argument("--suppress_rc", dest="set_rc", action='store_const', required=False,
+                        const=False, default=True,
+                        help="Suppress return code if coverage holes found")
+
+    return parser
+
+
+def merge_coverage(fnames, debug=False, include_merged=False):
+    """Merge coverage files by bin name
+
+    Returns the bin names, the total hits for each bin, the runs
+    that hit each bin, and the names of all the runs. Files
+    written by this script are skipped, as their runs' own files
+    are usually merged too, unless include_merged is True. Then
+    each one counts as all the runs it merged.
+    """
+    bin_names = []
+    counts = []
+    contributors = []
+    bin_index = {}
+    # Most files share the same bins, so map each bin list to
+    # merged bin numbers once
+    layouts = {}
+    runs = []
+    for fname in fnames:
+        if debug:
+            print("Reading file %s" % fname)
+        (metadata, file_counts) = read_coverage(fname)
+        if "runs" in metadata and not include_merged:
+            if debug:
+                print("Skipping merged file %s" % fname)
+            continue
+        if "runs" in metadata:
+            runs.extend(metadata["runs"])
+            file_contributors = metadata["contributors"]
+        else:
+            runs.append(run_name(metadata))
+            file_contributors = [runs[-1:]] * len(file_counts)
+        layout = tuple(metadata["bins"])
+        mapping = layouts.get(layout)
+        if mapping is None:
+            mapping = []
+            for name in layout:
+                if name not in bin_index:
+                    bin_index[name] = len(bin_names)
+                    bin_names.append(name)
+                    counts.append(0)
+                    contributors.append([])
+                mapping.append(bin_index[name])
+            layouts[layout] = mapping
+        for (merged_bin, count, bin_runs) in zip(mapping, file_counts, file_contributors):
+            if count:
+                counts[merged_bin] += count
+                contributors[merged_bin].extend(bin_runs)
+    return bin_names, counts, contributors, runs
+
+
+def main():
+
+    parser = get_parser()
+    args = parser.parse_args()
+    rc = 0
+
+    output = os.path.abspath(args.output_file)
+    fnames = [fname for fname in find_coverage(".cov", args.directory)
+              if os.path.abspath(fname) != output]
+    (bin_names, counts, contributors, runs) = merge_coverage(fnames, args.debug,
+                                                             args.include_merged)
+
+    holes = [name for (name, count) in zip(bin_names, counts) if count == 0]
+    if args.debug:
+        for (name, count, bin_runs) in zip(bin_names, counts, contributors):
+            print("%s: %d hits from %s" % (name, count, ", ".join(bin_runs)))
+    for name in holes:
+        if args.set_rc:
+            rc = 1
+        print("Coverage hole: '{}'".format(name))
+    print("Merged coverage from %d runs: %d of %d bins hit"
+          % (len(runs), len(bin_names) - len(holes), len(bin_names)))
+
+    write_coverage(args.output_file, bin_names, counts,
+                   runs=runs, contributors=contributors)
+    if args.report_file is not None:
+        with open(args.report_file, "w", newline="") as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(["bin", "hits", "runs"])
+            for (name, count, bin_runs) in zip(bin_names, counts, contributors):
+                writer.writerow([name, count, " ".join(bin_runs)])
+    return rc
+
+
+if __name__ == "__main__":
+    rc = main()
+    sys.exit(rc)
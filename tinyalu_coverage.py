@@ -0,0 +1,56 @@
+from array import array
+from pathlib import PurePath
+import json
+import struct
+import sys
+
+
+# # TinyALU coverage databases
+# A coverage file is an 8-byte header, a 4-byte little-endian
+# metadata length, that many bytes of JSON metadata, and a
+# little-endian 64-bit hit count for each bin. The metadata
+# holds the bin names in "bins" and whatever else the writer
+# passes, such as the test name and seed.
+HEADER = b"TALUCOV1"
+LENGTH = struct.Struct("<I")
+
+
+def write_coverage(path, bin_names, counts, **metadata):
+    """Write hit counts for bin_names to path"""
+    metadata["bins"] = list(bin_names)
+    encoded = json.dumps(metadata).encode()
+    counts = array("Q", counts)
+    assert len(counts) == len(metadata["bins"]), \
+        "Need one hit count for each bin"
+    if sys.byteorder == "big":
+        counts.byteswap()
+    with open(path, "wb") as coverage_file:
+        coverage_file.write(HEADER)
+        coverage_file.write(LENGTH.pack(len(encoded)))
+        coverage_file.write(encoded)
+        coverage_file.write(counts.tobytes())
+
+
+def read_coverage(path):
+    """Return the metadata dict and array("Q") of hit counts in path"""
+    with open(path, "rb") as coverage_file:
+        assert coverage_file.read(len(HEADER)) == HEADER, \
+            f"{path} is not a TinyALU coverage file"
+        (length,) = LENGTH.unpack(coverage_file.read(LENGTH.size))
+        metadata = json.loads(coverage_file.read(length))
+        counts = array("Q")
+        counts.frombytes(coverage_file.read())
+    if sys.byteorder == "big":
+        counts.byteswap()
+    assert len(counts) == len(metadata["bins"]), \
+        f"{path} has {len(counts)} hit counts for {len(metadata['bins'])} bins"
+    return metadata, counts
+
+
+def run_name(metadata):
+    """The directory/test:seed name of the run that wrote a
+    coverage file"""
+    name = f"{metadata.get('test')}:{metadata.get('seed')}"
+    if "directory" in metadata:
+        name = f"{PurePath(metadata['directory']).name}/{name}"
+    return name
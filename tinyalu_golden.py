@@ -0,0 +1,141 @@
+from array import array
+from pathlib import Path
+import enum
+import mmap
+import operator
+import os
+import sys
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# # The TinyALU golden model
+# Ops and the prediction functions import nothing from cocotb
+# or pyuvm, so offline tools such as check_records.py can use
+# them. tinyalu_utils re-exports them for the testbenches.
+
+# #### The OPS enumeration
+
+# Figure 4: The operation enumeration
+@enum.unique
+class Ops(enum.IntEnum):
+    """Legal ops for the TinyALU"""
+    ADD = 1
+    AND = 2
+    XOR = 3
+    MUL = 4
+
+
+# #### The alu_prediction function
+
+# Figure 5: The prediction function for the scoreboard
+def alu_prediction(A, B, op):
+    """Python model of the TinyALU"""
+    assert isinstance(op, Ops), "The tinyalu op must be of type Ops"
+    if op == Ops.ADD:
+        result = A + B
+    elif op == Ops.AND:
+        result = A & B
+    elif op == Ops.XOR:
+        result = A ^ B
+    elif op == Ops.MUL:
+        result = A * B
+    return result
+
+
+# #### The batched alu_prediction function
+
+# The same operations as alu_prediction() keyed by op number
+ALU_OPERATORS = {
+    Ops.ADD: operator.add,
+    Ops.AND: operator.and_,
+    Ops.XOR: operator.xor,
+    Ops.MUL: operator.mul,
+}
+
+
+def alu_prediction_batch(A, B, op):
+    """Predict a whole batch of TinyALU results in one call
+
+    A, B, and op are equal-length sequences (NumPy arrays,
+    array.array, or lists) with op holding Ops values.
+    Returns a NumPy uint32 array if NumPy is installed and
+    any argument is an ndarray, otherwise an array.array('L').
+    """
+    assert len(A) == len(B) == len(op), "A, B, and op must be the same length"
+    if np is not None and any(isinstance(arg, np.ndarray) for arg in (A, B, op)):
+        aa = np.asarray(A, dtype=np.uint32)
+        bb = np.asarray(B, dtype=np.uint32)
+        ops = np.asarray(op)
+        assert np.isin(ops, list(Ops)).all(), "The tinyalu ops must be Ops values"
+        return np.select(
+            [ops == Ops.ADD, ops == Ops.AND, ops == Ops.XOR, ops == Ops.MUL],
+            [aa + bb, aa & bb, aa ^ bb, aa * bb]).astype(np.uint32)
+    assert set(op) <= set(Ops), "The tinyalu ops must be Ops values"
+    return array("L", map(lambda aa, bb, oo: ALU_OPERATORS[oo](aa, bb),
+                          A, B, op))
+
+
+# #### The precomputed prediction table
+
+# 256 A values x 256 B values x 4 ops, stored as
+# little-endian 16-bit results in op, A, B order
+PREDICTION_TABLE_PATH = Path(__file__).resolve().with_name("tinyalu_predictions.bin")
+
+
+def prediction_index(A, B, op):
+    """Position of (A, B, op) in the prediction table"""
+    return ((op - 1) << 16) | (A << 8) | B
+
+
+def write_prediction_table(path=PREDICTION_TABLE_PATH):
+    """Write every TinyALU result to path
+
+    Writes to a temporary file and renames it so that parallel
+    workers never see a partially written table.
+    """
+    ops, aas, bbs = zip(*((op, aa, bb) for op in Ops
+                          for aa in range(256) for bb in range(256)))
+    table = array("H", alu_prediction_batch(aas, bbs, ops))
+    if sys.byteorder != "little":
+        table.byteswap()
+    tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as tmp_file:
+        table.tofile(tmp_file)
+    os.replace(tmp_path, path)
+
+
+class PredictionTable:
+    """Memory-mapped table of every TinyALU result
+
+    Index it with a command tuple: table[(A, B, op)].
+    All the processes that map the same file share its pages.
+    The table file is built the first time it is needed.
+    """
+
+    def __init__(self, path=PREDICTION_TABLE_PATH):
+        if not Path(path).exists():
+            write_prediction_table(path)
+        with open(path, "rb") as table_file:
+            self.mmap = mmap.mmap(table_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        if sys.byteorder == "little":
+            self.results = memoryview(self.mmap).cast("H")
+        else:
+            self.results = array("H", self.mmap)
+            self.results.byteswap()
+        assert len(self.results) == len(Ops) << 16, \
+            f"{path} is not a TinyALU prediction table"
+
+    def __getitem__(self, cmd):
+        (A, B, op) = cmd
+        return self.results[prediction_index(A, B, op)]
+
+    def predict_batch(self, A, B, op):
+        """Look up NumPy arrays of commands in one gather"""
+        index = prediction_index(np.asarray(A, dtype=np.intp),
+                                 np.asarray(B, dtype=np.intp),
+                                 np.asarray(op, dtype=np.intp))
+        return np.frombuffer(self.mmap, dtype="<u2")[index]
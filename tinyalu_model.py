@@ -0,0 +1,226 @@
+import cocotb
+from cocotb.queue import Queue
+from cocotb.triggers import FallingEdge, RisingEdge
+from cocotb.utils import get_sim_time
+from tinyalu_utils import BaseTinyAluBfm, get_int, logger
+
+
+# # A cycle-accurate Python model of the TinyALU
+# The classes mirror the modules in tinyalu_hdl/verilog/tinyalu.sv.
+# Registers start at 0 rather than X, so compare the model
+# against the HDL after reset.
+
+# ## Signal handles
+class ModelSignal:
+    """A model port with the .value interface of a cocotb handle"""
+    __slots__ = ("_path", "width", "_value")
+
+    def __init__(self, path, width):
+        self._path = path
+        self.width = width
+        self._value = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, new_value):
+        self._value = int(new_value) & ((1 << self.width) - 1)
+
+
+class ModelOutput:
+    """A combinational model output computed when it is read"""
+    __slots__ = ("_path", "compute")
+
+    def __init__(self, path, compute):
+        self._path = path
+        self.compute = compute
+
+    @property
+    def value(self):
+        return self.compute()
+
+
+# ## The submodules
+class SingleCycle:
+    """single_cycle: ADD, AND, and XOR in one clock"""
+
+    def __init__(self):
+        self.done = 0
+        self.result = 0
+
+    def rising_edge(self, A, B, op, reset_n, start):
+        if not reset_n:
+            self.result = 0
+            self.done = 0
+            return
+        if op == 1:
+            self.result = A + B
+        elif op == 2:
+            self.result = A & B
+        elif op == 3:
+            self.result = A ^ B
+        self.done = int(start == 1 and op != 0)
+
+
+class ThreeCycle:
+    """three_cycle: the pipelined multiplier"""
+
+    def __init__(self):
+        self.a_int = 0
+        self.b_int = 0
+        self.mult1 = 0
+        self.mult2 = 0
+        self.result = 0
+        self.done1 = 0
+        self.done2 = 0
+        self.done3 = 0
+        self.done = 0
+
+    def rising_edge(self, A, B, reset_n, start):
+        if not reset_n:
+            self.__init__()
+            return
+        # Nonblocking assignments read the old values
+        not_done = int(not self.done)
+        (self.a_int, self.b_int, self.mult1, self.mult2, self.result,
+         self.done3, self.done2, self.done1, self.done) = \
+            (A, B, self.a_int * self.b_int, self.mult1, self.mult2,
+             start & not_done, self.done3 & not_done,
+             self.done2 & not_done, self.done1 & not_done)
+
+
+# ## The tinyalu top level
+class TinyAluModel:
+    """tinyalu with the ports of cocotb.top
+
+    Assign the inputs through .value as with a simulator
+    handle, then call rising_edge() and falling_edge() to
+    advance the clock.
+    """
+
+    def __init__(self, path="tinyalu_model"):
+        self._path = path
+        self.A = ModelSignal(f"{path}.A", 8)
+        self.B = ModelSignal(f"{path}.B", 8)
+        self.op = ModelSignal(f"{path}.op", 3)
+        self.start = ModelSignal(f"{path}.start", 1)
+        self.reset_n = ModelSignal(f"{path}.reset_n", 1)
+        self.clk = ModelSignal(f"{path}.clk", 1)
+        self.single = SingleCycle()
+        self.mult = ThreeCycle()
+        self.done = ModelOutput(f"{path}.done", self.get_done)
+        self.result = ModelOutput(f"{path}.result", self.get_result)
+        self.cycles = 0
+
+    def get_done(self):
+        return self.mult.done if self.op.value & 4 else self.single.done
+
+    def get_result(self):
+        return self.mult.result if self.op.value & 4 else self.single.result
+
+    def rising_edge(self):
+        A = self.A.value
+        B = self.B.value
+        op = self.op.value
+        reset_n = self.reset_n.value
+        start = self.start.value
+        mult_op = op >> 2
+        self.single.rising_edge(A, B, op, reset_n, start & (mult_op ^ 1))
+        self.mult.rising_edge(A, B, reset_n, start & mult_op)
+        self.clk.value = 1
+        self.cycles += 1
+
+    def falling_edge(self):
+        self.clk.value = 0
+
+
+# ## Running the BFM on the model
+def reset_model(model, bfm):
+    """BaseTinyAluBfm.reset() without a simulator"""
+    model.falling_edge()
+    model.reset_n.value = 0
+    model.A.value = 0
+    model.B.value = 0
+    model.op.value = 0
+    model.rising_edge()
+    model.falling_edge()
+    model.reset_n.value = 1
+    model.rising_edge()
+    model.falling_edge()
+    bfm.start_sampling()
+
+
+def run_commands(commands, model=None):
+    """Run (A, B, op) commands through the BFM and the model
+
+    Uses the BFM's sampler steps to drive and monitor the model,
+    with no simulator, and returns the commands and results the
+    monitors saw, in order.
+    """
+    model = TinyAluModel() if model is None else model
+    bfm = BaseTinyAluBfm(model)
+    bfm.cmd_driver_queue = Queue(maxsize=0)
+    for cmd in commands:
+        bfm.cmd_driver_queue.put_nowait(cmd)
+    reset_model(model, bfm)
+    while bfm.result_mon_queue.qsize() < len(commands):
+        model.rising_edge()
+        model.falling_edge()
+        bfm.sample_edge()
+    cmds = [bfm.cmd_mon_queue.get_nowait() for _ in commands]
+    results = [bfm.result_mon_queue.get_nowait() for _ in commands]
+    return cmds, results
+
+
+def clock_models(bfms):
+    """Advance the model under each BFM by one clock together
+
+    Each BFM drives and monitors its own model through the
+    sampler steps, as in run_commands().
+    """
+    for bfm in bfms:
+        bfm.dut.rising_edge()
+    for bfm in bfms:
+        bfm.dut.falling_edge()
+        bfm.sample_edge()
+
+
+# ## Cross-checking the model against the HDL
+def start_cross_check(dut, model=None):
+    """Launch cross_check() and return the model it runs
+
+    Read the model's mismatches list at the end of the test.
+    """
+    model = TinyAluModel() if model is None else model
+    model.mismatches = []
+    cocotb.start_soon(cross_check(dut, model))
+    return model
+
+
+async def cross_check(dut, model):
+    """Run the model in lockstep with dut and compare outputs
+
+    Copies the inputs into the model on every rising edge and
+    compares done and result on every falling edge once reset_n
+    is high.
+    """
+    inputs = ("A", "B", "op", "reset_n", "start")
+    while True:
+        await RisingEdge(dut.clk)
+        for name in inputs:
+            getattr(model, name).value = get_int(getattr(dut, name))
+        model.rising_edge()
+        await FallingEdge(dut.clk)
+        model.falling_edge()
+        if not model.reset_n.value:
+            continue
+        for name in ("done", "result"):
+            hdl_value = get_int(getattr(dut, name))
+            model_value = getattr(model, name).value
+            if hdl_value != model_value:
+                model.mismatches.append(
+                    (get_sim_time(), name, hdl_value, model_value))
+                logger.error(f"Model mismatch at {get_sim_time()}: {name} "
+                             f"is {hdl_value} and model has {model_value}")
@@ -0,0 +1,121 @@
+from collections import deque
+import struct
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# # Binary TinyALU transaction records
+# A record file is an 8-byte header followed by 16-byte
+# little-endian records: sim time, A, B, op, a pad byte,
+# the 16-bit result and two pad bytes.
+HEADER = b"TALUREC1"
+RECORD = struct.Struct("<QBBBxHxx")
+if np is not None:
+    RECORD_DTYPE = np.dtype({"names": ["time", "A", "B", "op", "result"],
+                             "formats": ["<u8", "u1", "u1", "u1", "<u2"],
+                             "offsets": [0, 8, 9, 10, 12],
+                             "itemsize": RECORD.size})
+
+
+# ## Writing records
+class TransactionWriter:
+    """Buffered writer of fixed-size transaction records"""
+
+    def __init__(self, path, buffer_records=4096):
+        self.file = open(path, "wb")
+        self.file.write(HEADER)
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.offset = 0
+        self.count = 0
+
+    def write(self, time, A, B, op, result):
+        RECORD.pack_into(self.buffer, self.offset, time, A, B, op, result)
+        self.offset += RECORD.size
+        self.count += 1
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[:self.offset])
+        self.offset = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class TransactionRecorder(TransactionWriter):
+    """Pairs monitored commands with results and writes them
+
+    Feed it with record_cmd() from the command monitor and
+    record_result() from the result monitor. Results pair with
+    commands in order, and each record gets the time that
+    clock() returns when its result arrives.
+    """
+
+    def __init__(self, path, clock, buffer_records=4096):
+        super().__init__(path, buffer_records)
+        self.clock = clock
+        self.pending = deque()
+
+    def record_cmd(self, cmd):
+        self.pending.append(cmd)
+
+    def record_result(self, result):
+        (A, B, op) = self.pending.popleft()
+        self.write(self.clock(), A, B, op, result)
+
+
+# ## Reading records
+def check_header(record_file, path):
+    assert record_file.read(len(HEADER)) == HEADER, \
+        f"{path} is not a TinyALU record file"
+
+
+def record_count(path):
+    """The number of records in path"""
+    with open(path, "rb") as record_file:
+        check_header(record_file, path)
+        record_file.seek(0, 2)
+        return (record_file.tell() - len(HEADER)) // RECORD.size
+
+
+def read_records(path, first=0, count=None, chunk_records=4096):
+    """Yield (time, A, B, op, result) tuples from path
+
+    Reads chunk_records records at a time, starting by seeking
+    to record number first and stopping after count records.
+    """
+    with open(path, "rb") as record_file:
+        check_header(record_file, path)
+        record_file.seek(len(HEADER) + first * RECORD.size)
+        remaining = count
+        while remaining is None or remaining > 0:
+            chunk = chunk_records if remaining is None \
+                else min(chunk_records, remaining)
+            data = record_file.read(chunk * RECORD.size)
+            data = data[:len(data) - len(data) % RECORD.size]
+            if not data:
+                break
+            yield from RECORD.iter_unpack(data)
+            if remaining is not None:
+                remaining -= len(data) // RECORD.size
+
+
+def read_records_array(path):
+    """Memory-map path as a NumPy structured array with
+    time, A, B, op, and result fields"""
+    count = record_count(path)
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=len(HEADER),
+                     shape=(count,))
@@ -1,38 +1,19 @@
 import cocotb
-from cocotb.triggers import FallingEdge
-from cocotb.queue import QueueEmpty, Queue
-import enum
+from cocotb.triggers import Event, FallingEdge, RisingEdge, Timer
+from cocotb.utils import get_sim_time
+from cocotb.queue import QueueEmpty, QueueFull, Queue
+from array import array
 import logging
 import pyuvm
-
-
-# #### The OPS enumeration
-
-# Figure 4: The operation enumeration
-@enum.unique
-class Ops(enum.IntEnum):
-    """Legal ops for the TinyALU"""
-    ADD = 1
-    AND = 2
-    XOR = 3
-    MUL = 4
-
-
-# #### The alu_prediction function
-
-# Figure 5: The prediction function for the scoreboard
-def alu_prediction(A, B, op):
-    """Python model of the TinyALU"""
-    assert isinstance(op, Ops), "The tinyalu op must be of type Ops"
-    if op == Ops.ADD:
-        result = A + B
-    elif op == Ops.AND:
-        result = A & B
-    elif op == Ops.XOR:
-        result = A ^ B
-    elif op == Ops.MUL:
-        result = A * B
-    return result
+from tinyalu_record import TransactionRecorder
+# The golden model does not import cocotb, so offline tools
+# import it from tinyalu_golden. Testbenches get it from here.
+from tinyalu_golden import ALU_OPERATORS, Ops, PredictionTable, \
+    alu_prediction, alu_prediction_batch  # noqa: F401
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 # #### The logger
@@ -54,17 +35,280 @@ def get_int(signal):
     return int_val
 
 
+# ### Reading a signal value without exceptions
+class SignalReader:
+    """get_int() for one cached signal handle
+
+    Converting a resolvable value with int() is cheaper than
+    checking is_resolvable, but raising ValueError on every X/Z
+    sample is expensive. So the reader calls int() directly until
+    it sees an X/Z value, then checks is_resolvable first until
+    the signal resolves again. That costs at most one exception
+    per X/Z episode. It counts the X/Z samples it turned into 0
+    if count_xz is True.
+    """
+    __slots__ = ("handle", "count_xz", "xz_samples", "in_xz")
+
+    def __init__(self, handle, count_xz=False):
+        self.handle = handle
+        self.count_xz = count_xz
+        self.xz_samples = 0
+        self.in_xz = False
+
+    def get(self):
+        value = self.handle.value
+        if self.in_xz:
+            if value.is_resolvable:
+                self.in_xz = False
+                return int(value)
+        else:
+            try:
+                return int(value)
+            except ValueError:
+                self.in_xz = True
+        if self.count_xz:
+            self.xz_samples += 1
+        return 0
+
+
+# ### Fixed-size monitor queues
+class RingBuffer:
+    """A fixed-size queue stored as one typed array per column
+
+    columns maps column names to array typecodes, for example
+    {"A": "B", "B": "B", "op": "B"}. put_nowait() takes a tuple
+    with one value per column, or a bare value for a single
+    column, and get() and get_nowait() return the same. With
+    timestamps=True each row also records get_sim_time().
+
+    The arrays hold high_water rows, so memory stays flat. A
+    put_nowait() into a full buffer raises QueueFull rather than
+    drop a row and misalign the command and result streams.
+    get_many() drains rows in bulk.
+    """
+
+    def __init__(self, columns, high_water=65536, timestamps=False):
+        self.names = list(columns)
+        self.columns = [array(code, [0]) * high_water
+                        for code in columns.values()]
+        self.times = array("Q", [0]) * high_water if timestamps else None
+        self.single = len(self.columns) == 1
+        self.high_water = high_water
+        self.head = 0
+        self.size = 0
+        self.peak = 0
+        self.not_empty = Event()
+
+    def qsize(self):
+        return self.size
+
+    def empty(self):
+        return self.size == 0
+
+    def put_nowait(self, item):
+        if self.size == self.high_water:
+            raise QueueFull(f"RingBuffer is full at its high-water mark "
+                            f"of {self.high_water} rows")
+        tail = (self.head + self.size) % self.high_water
+        if self.single:
+            self.columns[0][tail] = item
+        else:
+            for column, value in zip(self.columns, item):
+                column[tail] = value
+        if self.times is not None:
+            self.times[tail] = get_sim_time()
+        self.size += 1
+        if self.size > self.peak:
+            self.peak = self.size
+        self.not_empty.set()
+
+    def get_nowait(self):
+        if self.size == 0:
+            raise QueueEmpty()
+        head = self.head
+        self.head = (head + 1) % self.high_water
+        self.size -= 1
+        if self.single:
+            return self.columns[0][head]
+        return tuple(column[head] for column in self.columns)
+
+    async def get(self):
+        while self.size == 0:
+            self.not_empty.clear()
+            await self.not_empty.wait()
+        return self.get_nowait()
+
+    def get_many(self, count):
+        """Remove up to count rows and return a dict of column arrays
+
+        The dict has a "time" array too if the buffer keeps
+        timestamps.
+        """
+        count = min(count, self.size)
+        first = self.head
+        last = first + count
+        named = list(zip(self.names, self.columns))
+        if self.times is not None:
+            named.append(("time", self.times))
+        if last <= self.high_water:
+            rows = {name: column[first:last] for (name, column) in named}
+        else:
+            last -= self.high_water
+            rows = {name: column[first:] + column[:last]
+                    for (name, column) in named}
+        self.head = last % self.high_water
+        self.size -= count
+        return rows
+
+
+# ### Queue occupancy and backpressure
+class InstrumentedQueue:
+    """Wraps a BFM queue and records how it was used
+
+    Tracks the time-weighted average and peak number of items,
+    the simulation time that put() callers spent blocked on a
+    full queue, and the time that get() callers spent waiting
+    on an empty one. Times are in simulator steps.
+    """
+
+    def __init__(self, queue, name):
+        self.queue = queue
+        self.name = name
+        self.start_time = self.last_change = get_sim_time()
+        self.occupancy_area = 0
+        self.peak = queue.qsize()
+        self.puts = 0
+        self.gets = 0
+        self.put_wait = 0
+        self.get_wait = 0
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def empty(self):
+        return self.queue.empty()
+
+    def advance(self, size_change=0):
+        """Add the time since the last change at the old size"""
+        now = get_sim_time()
+        old_size = self.queue.qsize() - size_change
+        self.occupancy_area += old_size * (now - self.last_change)
+        self.last_change = now
+        return now
+
+    def put_nowait(self, item):
+        self.advance()
+        self.queue.put_nowait(item)
+        self.puts += 1
+        self.peak = max(self.peak, self.queue.qsize())
+
+    def get_nowait(self):
+        self.advance()
+        item = self.queue.get_nowait()
+        self.gets += 1
+        return item
+
+    def get_many(self, count):
+        self.advance()
+        rows = self.queue.get_many(count)
+        self.gets += len(next(iter(rows.values()), ()))
+        return rows
+
+    async def put(self, item):
+        start_time = self.advance()
+        await self.queue.put(item)
+        self.put_wait += self.advance(size_change=1) - start_time
+        self.puts += 1
+        self.peak = max(self.peak, self.queue.qsize())
+
+    async def get(self):
+        start_time = self.advance()
+        item = await self.queue.get()
+        self.get_wait += self.advance(size_change=-1) - start_time
+        self.gets += 1
+        return item
+
+    def report(self):
+        """A one-line summary of the queue's use so far"""
+        now = self.advance()
+        elapsed = now - self.start_time
+        average = self.occupancy_area / elapsed if elapsed else 0
+        return (f"{self.name}: average occupancy {average:.2f}, "
+                f"peak {self.peak}, {self.puts} puts blocked for "
+                f"{self.put_wait} steps, {self.gets} gets waited for "
+                f"{self.get_wait} steps over {elapsed} steps")
+
+
+# ### Recording monitored transactions
+class RecordingQueue:
+    """Wraps a BFM monitor queue and passes each item that is
+    put into it to record_fn"""
+
+    def __init__(self, queue, record_fn):
+        self.queue = queue
+        self.record_fn = record_fn
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+    def put_nowait(self, item):
+        self.record_fn(item)
+        self.queue.put_nowait(item)
+
+
+def remove_recording(queue):
+    """Remove the RecordingQueue from a chain of queue wrappers
+
+    Other wrappers, such as an InstrumentedQueue added after
+    recording started, stay in place.
+    """
+    if isinstance(queue, RecordingQueue):
+        return queue.queue
+    assert hasattr(queue, "queue"), "The queue is not being recorded"
+    queue.queue = remove_recording(queue.queue)
+    return queue
+
+
+# ### Sampling all the ports at once
+class TinyAluSample:
+    """The TinyALU ports on one falling clock edge
+
+    start and done are sampled on every edge. The bus values
+    stay None unless a monitor reads them on that edge.
+    """
+    __slots__ = ("start", "done", "A", "B", "op", "result")
+
+    def __init__(self, start, done):
+        self.start = start
+        self.done = done
+        self.A = None
+        self.B = None
+        self.op = None
+        self.result = None
+
+
 # ## The TinyAluBfm singleton
 # ### Initializing the TinyAluBfm object
 
 
 # Figure 3: Initializing the TinyAluBfm singleton
-class TinyAluBfm(metaclass=pyuvm.Singleton):
-    def __init__(self):
-        self.dut = cocotb.top
+# BaseTinyAluBfm drives any TinyALU handle. TinyAluBfm,
+# at the end of the file, is the singleton for cocotb.top.
+class BaseTinyAluBfm:
+    def __init__(self, dut):
+        self.dut = dut
         self.cmd_driver_queue = Queue(maxsize=1)
         self.cmd_mon_queue = Queue(maxsize=0)
         self.result_mon_queue = Queue(maxsize=0)
+        self.readers = {name: SignalReader(getattr(self.dut, name))
+                        for name in ("A", "B", "op", "start", "done",
+                                     "result")}
+        self.edge_monitors = False
+        self.sampled = False
+        self.idle_sleep = False
 
 # ### The reset coroutine
 
@@ -107,6 +351,47 @@ class TinyAluBfm(metaclass=pyuvm.Singleton):
                 self.cmd_mon_queue.put_nowait(cmd_tuple)
             prev_start = start
 
+# #### X/Z counting
+    def set_xz_counting(self, count_xz=True):
+        """Count the X/Z samples the SignalReaders see"""
+        for reader in self.readers.values():
+            reader.count_xz = count_xz
+
+    def xz_samples(self):
+        """The number of X/Z samples read from each port"""
+        return {name: reader.xz_samples
+                for (name, reader) in self.readers.items()}
+
+# #### Edge-triggered monitors
+    def set_edge_monitor_mode(self):
+        """Have start_tasks() launch the edge-triggered monitors"""
+        self.edge_monitors = True
+
+    async def edge_result_mon(self):
+        """result_mon() that sleeps until done rises
+
+        Reads the result on the falling edge after done rises,
+        which is the edge on which result_mon() sees it.
+        """
+        result = self.readers["result"]
+        while True:
+            await RisingEdge(self.dut.done)
+            await FallingEdge(self.dut.clk)
+            self.result_mon_queue.put_nowait(result.get())
+
+    async def edge_cmd_mon(self):
+        """cmd_mon() that sleeps until start rises
+
+        Reads the command on the falling edge after start rises,
+        which is the edge on which cmd_mon() sees it.
+        """
+        (aa, bb, op) = (self.readers[name] for name in ("A", "B", "op"))
+        while True:
+            await RisingEdge(self.dut.start)
+            await FallingEdge(self.dut.clk)
+            cmd_tuple = (aa.get(), bb.get(), op.get())
+            self.cmd_mon_queue.put_nowait(cmd_tuple)
+
 # #### driver()
 # Figure 8: Driving commands on the falling edge of clk
     async def cmd_driver(self):
@@ -134,12 +419,192 @@ class TinyAluBfm(metaclass=pyuvm.Singleton):
                 if dn == 1:
                     self.dut.start.value = 0
 
+# #### A deeper command queue
+    def set_cmd_backlog(self, backlog=16):
+        """Let send_op() queue up to backlog commands
+
+        This does not raise throughput. cmd_driver() is already
+        back to back: it starts the next command on the edge after
+        done drops, so ADD, AND, and XOR take 2 clocks and MUL
+        takes 5 with any backlog. A backlog only lets the sequences
+        run ahead of the driver.
+        """
+        self.cmd_driver_queue = Queue(maxsize=backlog)
+
+# #### idle_cmd_driver()
+    def set_idle_mode(self):
+        """Have start_tasks() launch idle_cmd_driver()"""
+        self.idle_sleep = True
+
+    async def idle_cmd_driver(self):
+        """cmd_driver() that sleeps on the queue while it is empty
+
+        cmd_driver() issues a queued command on the first falling
+        edge after it arrives once start and done are low. Start
+        and done are always low while the queue is empty, so this
+        driver waits on the queue and then on the next falling
+        edge, which gives the same pin timing without waking on
+        idle clocks. It samples done only while a command runs.
+        """
+        self.dut.start.value = 0
+        self.dut.A.value = 0
+        self.dut.B.value = 0
+        self.dut.op.value = 0
+        done = self.readers["done"]
+        while True:
+            (aa, bb, op) = await self.cmd_driver_queue.get()
+            await FallingEdge(self.dut.clk)
+            self.dut.A.value = aa
+            self.dut.B.value = bb
+            self.dut.op.value = op
+            self.dut.start.value = 1
+            while True:
+                await FallingEdge(self.dut.clk)
+                if done.get() == 1:
+                    self.dut.start.value = 0
+                    break
+
+# #### Fixed-size monitor queues
+    def set_ring_buffer_mode(self, high_water=65536):
+        """Replace the monitor queues with timestamped RingBuffers
+
+        A monitor that gets high_water rows ahead of its consumer
+        stops the test with QueueFull.
+        """
+        self.cmd_mon_queue = RingBuffer({"A": "B", "B": "B", "op": "B"},
+                                        high_water, timestamps=True)
+        self.result_mon_queue = RingBuffer({"result": "H"}, high_water,
+                                           timestamps=True)
+
+# #### Queue instrumentation
+    def set_queue_instrumentation(self):
+        """Wrap the BFM queues in InstrumentedQueues
+
+        Call this after the other set_*_mode() methods. The
+        chapter drivers call log_queue_stats() in their
+        report_phase().
+        """
+        self.cmd_driver_queue = InstrumentedQueue(self.cmd_driver_queue,
+                                                  "cmd_driver_queue")
+        self.cmd_mon_queue = InstrumentedQueue(self.cmd_mon_queue,
+                                               "cmd_mon_queue")
+        self.result_mon_queue = InstrumentedQueue(self.result_mon_queue,
+                                                  "result_mon_queue")
+
+    def log_queue_stats(self):
+        for queue in (self.cmd_driver_queue, self.cmd_mon_queue,
+                      self.result_mon_queue):
+            if isinstance(queue, InstrumentedQueue):
+                logger.info(queue.report())
+
+# #### Transaction recording
+    def start_recording(self, path):
+        """Record every monitored transaction to path
+
+        Returns the TransactionRecorder. Call stop_recording()
+        at the end of the test to flush it.
+        """
+        self.recorder = TransactionRecorder(path, clock=get_sim_time)
+        self.cmd_mon_queue = RecordingQueue(self.cmd_mon_queue,
+                                            self.recorder.record_cmd)
+        self.result_mon_queue = RecordingQueue(self.result_mon_queue,
+                                               self.recorder.record_result)
+        return self.recorder
+
+    def stop_recording(self):
+        """Close the recording and unwrap the monitor queues"""
+        self.recorder.close()
+        self.cmd_mon_queue = remove_recording(self.cmd_mon_queue)
+        self.result_mon_queue = remove_recording(self.result_mon_queue)
+
+# #### sampler()
+    def set_sampled_mode(self):
+        """Have start_tasks() launch sampler() in place of the
+        driver and monitor coroutines"""
+        self.sampled = True
+
+    async def sampler(self):
+        """Drive and monitor the TinyALU from one coroutine
+
+        Wakes once per falling edge and reads done. The BFM is
+        the only driver of start, so the sampler tracks the value
+        it drove rather than reading it back. The bus values are
+        read only on the edges where start or done rise. The
+        monitor and driver steps see the same edges and pins as
+        cmd_mon(), result_mon() and cmd_driver().
+        """
+        self.start_sampling()
+        while True:
+            await FallingEdge(self.dut.clk)
+            self.sample_edge()
+
+    def start_sampling(self):
+        """Zero the command pins before the first sample_edge()"""
+        self.dut.start.value = 0
+        self.dut.A.value = 0
+        self.dut.B.value = 0
+        self.dut.op.value = 0
+        self.sampled_start = 0
+        self.prev_sample = TinyAluSample(0, 0)
+
+    def sample_edge(self):
+        """Monitor and drive the TinyALU on one falling edge"""
+        sample = TinyAluSample(self.sampled_start, self.readers["done"].get())
+        self.sample_cmd(sample, self.prev_sample)
+        self.sample_result(sample, self.prev_sample)
+        self.sampled_start = self.drive_sample(sample)
+        self.prev_sample = sample
+
+    def sample_cmd(self, sample, prev_sample):
+        """cmd_mon() for one sample"""
+        if sample.start == 1 and prev_sample.start == 0:
+            sample.A = self.readers["A"].get()
+            sample.B = self.readers["B"].get()
+            sample.op = self.readers["op"].get()
+            self.cmd_mon_queue.put_nowait((sample.A, sample.B, sample.op))
+
+    def sample_result(self, sample, prev_sample):
+        """result_mon() for one sample"""
+        if sample.done == 1 and prev_sample.done == 0:
+            sample.result = self.readers["result"].get()
+            self.result_mon_queue.put_nowait(sample.result)
+
+    def drive_sample(self, sample):
+        """cmd_driver() for one sample, returning the new start value"""
+        if sample.start == 0 and sample.done == 0:
+            try:
+                (aa, bb, op) = self.cmd_driver_queue.get_nowait()
+            except QueueEmpty:
+                return 0
+            self.dut.A.value = aa
+            self.dut.B.value = bb
+            self.dut.op.value = op
+            self.dut.start.value = 1
+            return 1
+        elif sample.start == 1 and sample.done == 1:
+            self.dut.start.value = 0
+            return 0
+        return sample.start
+
 # ### Launching the coroutines using start_soon
 # Figure 11: Start the BFM coroutines
+    def coroutines(self):
+        """The driver and monitor coroutines for the current modes"""
+        if self.sampled:
+            return [self.sampler()]
+        if self.idle_sleep:
+            coroutines = [self.idle_cmd_driver()]
+        else:
+            coroutines = [self.cmd_driver()]
+        if self.edge_monitors:
+            coroutines += [self.edge_cmd_mon(), self.edge_result_mon()]
+        else:
+            coroutines += [self.cmd_mon(), self.result_mon()]
+        return coroutines
+
     def start_tasks(self):
-        cocotb.start_soon(self.cmd_driver())
-        cocotb.start_soon(self.cmd_mon())
-        cocotb.start_soon(self.result_mon())
+        for coroutine in self.coroutines():
+            cocotb.start_soon(coroutine)
 
 # Figure 12: The get_cmd() coroutine returns the next command
     async def get_cmd(self):
@@ -155,3 +620,105 @@ class TinyAluBfm(metaclass=pyuvm.Singleton):
     async def send_op(self, aa, bb, op):
         command_tuple = (aa, bb, op)
         await self.cmd_driver_queue.put(command_tuple)
+
+
+# ## One BFM per TinyALU
+class TinyAluBfm(BaseTinyAluBfm, metaclass=pyuvm.Singleton):
+    """The BFM for the TinyALU at cocotb.top"""
+
+    def __init__(self):
+        super().__init__(cocotb.top)
+
+
+class TinyAluBfmRegistry(metaclass=pyuvm.Singleton):
+    """One BFM per TinyALU instance keyed by its handle path
+
+    Each BFM has its own queues and coroutines. cocotb.top
+    maps to the TinyAluBfm singleton.
+    """
+
+    def __init__(self):
+        self.bfms = {}
+
+    def get_bfm(self, dut):
+        """The BFM for dut, created the first time it is requested"""
+        try:
+            return self.bfms[dut._path]
+        except KeyError:
+            pass
+        if dut is cocotb.top:
+            bfm = TinyAluBfm()
+        else:
+            bfm = BaseTinyAluBfm(dut)
+        self.bfms[dut._path] = bfm
+        return bfm
+
+
+def get_bfm(component):
+    """The BFM stored under "BFM" in the ConfigDB for component
+
+    Falls back on the TinyAluBfm singleton, so single-TinyALU
+    testbenches need not set anything. Multi-TinyALU testbenches
+    store a TinyAluBfmRegistry BFM for each part of the hierarchy:
+    ConfigDB().set(self, "alu1_env.*", "BFM",
+                   TinyAluBfmRegistry().get_bfm(cocotb.top.alu1))
+    """
+    try:
+        return pyuvm.ConfigDB().get(component, "", "BFM")
+    except pyuvm.UVMConfigItemNotFound:
+        pass
+    try:
+        bfm = pyuvm.uvm_factory().create_object_by_name("TinyAluBfm",
+                                                        name="bfm")
+    except pyuvm.UVMFactoryError:
+        return TinyAluBfm()
+    # Share the overriding BFM with every other component
+    pyuvm.ConfigDB().set(None, "*", "BFM", bfm)
+    return bfm
+
+
+# ## The transaction-level BFM
+class TinyAluTlmBfm(pyuvm.uvm_object):
+    """A BFM that answers from the golden model without clocks
+
+    Select it for every component that calls get_bfm() with
+    uvm_factory().set_type_override_by_name("TinyAluBfm",
+                                             "TinyAluTlmBfm")
+    send_op() makes the command and its predicted result
+    available at once. cycles counts the clocks the TinyALU
+    would have spent on the ops back to back. Set period to a
+    number of simulation steps per clock to have send_op() wait
+    out each op's latency with a Timer.
+    """
+    latency = {Ops.ADD: 2, Ops.AND: 2, Ops.XOR: 2, Ops.MUL: 5}
+
+    def __init__(self, name="bfm"):
+        super().__init__(name)
+        self.cmd_mon_queue = Queue(maxsize=0)
+        self.result_mon_queue = Queue(maxsize=0)
+        self.cycles = 0
+        self.period = None
+
+    async def reset(self):
+        self.cycles = 0
+
+    def start_tasks(self):
+        pass
+
+    def log_queue_stats(self):
+        """The TLM BFM's queues are never instrumented"""
+
+    async def get_cmd(self):
+        return await self.cmd_mon_queue.get()
+
+    async def get_result(self):
+        return await self.result_mon_queue.get()
+
+    async def send_op(self, aa, bb, op):
+        op = Ops(op)
+        latency = self.latency[op]
+        self.cycles += latency
+        if self.period is not None:
+            await Timer(latency * self.period)
+        self.cmd_mon_queue.put_nowait((aa, bb, int(op)))
+        self.result_mon_queue.put_nowait(alu_prediction(aa, bb, op))
@@ -0,0 +1,516 @@
+from pyuvm import *
+from array import array
+from collections import Counter, deque
+from itertools import islice
+from pathlib import Path
+import csv
+import logging
+import random
+import cocotb
+from tinyalu_utils import ALU_OPERATORS, Ops, alu_prediction, \
+    alu_prediction_batch, np
+from tinyalu_record import read_records
+from tinyalu_coverage import write_coverage
+
+
+# # Reusable TinyALU UVM components
+# The chapter 40+ testbenches can import these alongside
+# tinyalu_utils.
+
+class AluSeqItem(uvm_sequence_item):
+    """The chapter 40+ ALU command sequence item"""
+
+    def __init__(self, name, aa, bb, op):
+        super().__init__(name)
+        self.A = aa
+        self.B = bb
+        self.op = Ops(op)
+
+    def __eq__(self, other):
+        same = self.A == other.A and self.B == other.B and self.op == other.op
+        return same
+
+    def __str__(self):
+        return f"{self.get_name()} : A: 0x{self.A:02x} \
+        OP: {self.op.name} ({self.op.value}) B: 0x{self.B:02x}"
+
+
+# ## Replaying recorded stimulus
+def parse_operand(text):
+    """An int written in decimal, such as 08, or with a 0x, 0o,
+    or 0b prefix"""
+    text = text.strip()
+    try:
+        return int(text, 0)
+    except ValueError:
+        return int(text, 10)
+
+
+def is_operand(text):
+    try:
+        parse_operand(text)
+    except ValueError:
+        return False
+    return True
+
+
+def read_csv_commands(path, csv_file):
+    """Yield the (A, B, op) commands in the rows of a CSV file
+
+    The first row is skipped if none of its fields is a number,
+    as in an A,B,op header. Any other row that is not an 8-bit
+    A and B and an Ops op raises ValueError. Blank lines are
+    ignored.
+    """
+    ops = set(Ops)
+    first_row = True
+    for (line, row) in enumerate(csv.reader(csv_file), start=1):
+        if not row:
+            continue
+        try:
+            (aa, bb, op) = (parse_operand(field) for field in row[:3])
+        except ValueError:
+            if first_row and not any(is_operand(field) for field in row):
+                first_row = False
+                continue
+            raise ValueError(f"{path}:{line}: expected A, B, op but got {row}") from None
+        first_row = False
+        if not (0 <= aa <= 0xFF and 0 <= bb <= 0xFF and op in ops):
+            raise ValueError(f"{path}:{line}: {row} is not a TinyALU command")
+        yield (aa, bb, op)
+
+
+def read_commands(path, first=0):
+    """Yield the (A, B, op) commands in a transaction file
+
+    path is either a tinyalu_record binary file or a CSV file
+    with A, B, and op columns and an optional header row.
+    Starts at command number first, which is a seek in a
+    binary file and a skip over rows in a CSV file.
+    """
+    if str(path).endswith(".csv"):
+        with open(path, newline="") as csv_file:
+            yield from islice(read_csv_commands(path, csv_file), first, None)
+    else:
+        for (_, aa, bb, op, _) in read_records(path, first):
+            yield (aa, bb, op)
+
+
+class ReplaySeq(uvm_sequence):
+    """Sends the commands in a recorded transaction file
+
+    Reads the file name from the REPLAY_FILE ConfigDB entry and
+    skips ahead to the command number in REPLAY_START, if it
+    exists. The file is streamed, not loaded.
+    """
+
+    async def body(self):
+        path = ConfigDB().get(None, "", "REPLAY_FILE")
+        try:
+            first = ConfigDB().get(None, "", "REPLAY_START")
+        except UVMConfigItemNotFound:
+            first = 0
+        for (aa, bb, op) in read_commands(path, first):
+            cmd_tr = AluSeqItem("cmd_tr", aa, bb, op)
+            await self.start_item(cmd_tr)
+            await self.finish_item(cmd_tr)
+
+
+# ## Checking and reporting
+class BaseScoreboard(uvm_component):
+    """Checks (A, B, op) commands against results
+
+    Counts passes and failures for each operation and keeps the
+    first MAX_REPORTED_FAILURES (ConfigDB, default 10) failure
+    messages for log_summary(), which report_phase() calls.
+    Messages for individual transactions are logged at DEBUG, so
+    set the scoreboard's logging level to DEBUG to see them.
+    """
+
+    def build_phase(self):
+        self.passed = Counter()
+        self.failed = Counter()
+        self.failures = []
+        try:
+            self.max_reported_failures = ConfigDB().get(
+                self, "", "MAX_REPORTED_FAILURES")
+        except UVMConfigItemNotFound:
+            self.max_reported_failures = 10
+
+    def check(self, cmd, actual_result):
+        """Check one result and return True if it passed"""
+        (A, B, op_numb) = cmd
+        op = Ops(op_numb)
+        predicted_result = alu_prediction(A, B, op)
+        if predicted_result == actual_result:
+            self.passed[op] += 1
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"PASSED: 0x{A:02x} {op.name} 0x{B:02x} ="
+                                  f" 0x{actual_result:04x}")
+            return True
+        self.failed[op] += 1
+        keep = len(self.failures) < self.max_reported_failures
+        if keep or self.logger.isEnabledFor(logging.DEBUG):
+            message = (f"FAILED: 0x{A:02x} {op.name} 0x{B:02x} "
+                       f"= 0x{actual_result:04x} "
+                       f"expected 0x{predicted_result:04x}")
+            if keep:
+                self.failures.append(message)
+            self.logger.debug(message)
+        return False
+
+    def failure_count(self):
+        return sum(self.failed.values())
+
+    def log_summary(self):
+        """Log the per-op counts and the sampled failures"""
+        for op in Ops:
+            if self.passed[op] or self.failed[op]:
+                self.logger.info(f"{op.name}: {self.passed[op]} PASSED, "
+                                 f"{self.failed[op]} FAILED")
+        failure_count = self.failure_count()
+        self.logger.info(f"Checked {sum(self.passed.values()) + failure_count}"
+                         f" transactions: {failure_count} FAILED")
+        for message in self.failures:
+            self.logger.error(message)
+        if failure_count > len(self.failures):
+            self.logger.error(f"{failure_count - len(self.failures)} "
+                              "more failures not shown")
+
+    def report_phase(self):
+        self.log_summary()
+
+
+# ### Checking results as they arrive
+class StreamingScoreboard(BaseScoreboard):
+    """A Scoreboard that checks each result when it arrives
+
+    Connect the command monitor to cmd_export and the results to
+    result_export, as with the chapter 43 Scoreboard. Commands and
+    results pair in order and are dropped once checked, so memory
+    grows with the outstanding commands, not the test length.
+    Set MAX_MISMATCHES in the ConfigDB to stop the test with a
+    UVMFatalError after that many failures.
+    """
+
+    def build_phase(self):
+        super().build_phase()
+        self.cmd_export = uvm_subscriber.uvm_AnalysisImp(
+            "cmd_export", self, self.write_cmd)
+        self.result_export = uvm_subscriber.uvm_AnalysisImp(
+            "result_export", self, self.write_result)
+        self.cmds = deque()
+        self.results = deque()
+        try:
+            self.max_mismatches = ConfigDB().get(self, "", "MAX_MISMATCHES")
+        except UVMConfigItemNotFound:
+            self.max_mismatches = None
+
+    def write_cmd(self, cmd):
+        if self.results:
+            self.check_result(cmd, self.results.popleft())
+        else:
+            self.cmds.append(cmd)
+
+    def write_result(self, result):
+        if self.cmds:
+            self.check_result(self.cmds.popleft(), result)
+        else:
+            self.results.append(result)
+
+    def check_result(self, cmd, actual_result):
+        if not self.check(cmd, actual_result) \
+                and self.failure_count() == self.max_mismatches:
+            self.log_summary()
+            raise UVMFatalError(
+                f"{self.get_full_name()} stopped the test after "
+                f"{self.max_mismatches} mismatches")
+
+    def check_phase(self):
+        for actual_result in self.results:
+            self.logger.critical(f"result {actual_result} had no command")
+
+
+# ### Matching results by tag
+class TaggedScoreboard(BaseScoreboard):
+    """A Scoreboard that matches results to commands by tag
+
+    cmd_export takes (tag, (A, B, op)) tuples and result_export
+    takes (tag, result) tuples. A tag is any hashable value that
+    is unique among outstanding transactions, such as a sequence
+    item's get_transaction_id() or a (DUT path, count) pair, so
+    results can come back in any order. A dictionary on each side
+    holds the entries waiting for their partner.
+
+    A command whose tag is reused before its result arrives
+    counts as a failure, and check_phase() reports the commands
+    and results left without a partner.
+
+    The reorder distance of a transaction is how many places it
+    moved between command order and result order, and
+    log_summary() logs the largest one.
+    """
+
+    def build_phase(self):
+        super().build_phase()
+        self.cmd_export = uvm_subscriber.uvm_AnalysisImp(
+            "cmd_export", self, self.write_cmd)
+        self.result_export = uvm_subscriber.uvm_AnalysisImp(
+            "result_export", self, self.write_result)
+        self.cmds = {}
+        self.results = {}
+        self.cmd_count = 0
+        self.result_count = 0
+        self.reorder_distances = Counter()
+
+    def write_cmd(self, tagged_cmd):
+        (tag, cmd) = tagged_cmd
+        if tag in self.cmds:
+            # The earlier command can no longer be matched
+            (_, (A, B, op_numb)) = self.cmds[tag]
+            self.failed[Ops(op_numb)] += 1
+            self.logger.error(f"Duplicate command tag {tag}: 0x{A:02x} "
+                              f"{Ops(op_numb).name} 0x{B:02x} was never checked")
+        entry = (self.cmd_count, cmd)
+        self.cmd_count += 1
+        if tag in self.results:
+            self.check_tagged(entry, self.results.pop(tag))
+        else:
+            self.cmds[tag] = entry
+
+    def write_result(self, tagged_result):
+        (tag, result) = tagged_result
+        entry = (self.result_count, result)
+        self.result_count += 1
+        if tag in self.cmds:
+            self.check_tagged(self.cmds.pop(tag), entry)
+        else:
+            self.results[tag] = entry
+
+    def check_tagged(self, cmd_entry, result_entry):
+        (cmd_number, cmd) = cmd_entry
+        (result_number, actual_result) = result_entry
+        self.reorder_distances[abs(result_number - cmd_number)] += 1
+        self.check(cmd, actual_result)
+
+    def check_phase(self):
+        for (tag, (_, actual_result)) in self.results.items():
+            self.logger.critical(
+                f"result {actual_result} with tag {tag} had no command")
+        for (tag, (_, cmd)) in self.cmds.items():
+            self.logger.critical(f"command {cmd} with tag {tag} had no result")
+
+    def log_summary(self):
+        super().log_summary()
+        if self.reorder_distances:
+            self.logger.info("Maximum reorder distance: "
+                             f"{max(self.reorder_distances)}")
+
+
+# ## Cross coverage
+# Operand bins are checked in order and values that fall in
+# none of them land in an "other" bin
+OPERAND_BINS = {
+    "zero": (0x00,),
+    "ones": (0xFF,),
+    "alternating": (0x55, 0xAA),
+}
+# Ops whose result can carry out of the low byte
+CARRY_OPS = (Ops.ADD, Ops.MUL)
+
+
+class CrossCoverage(uvm_subscriber):
+    """Covers op x A bin x B bin, and carry for ADD and MUL
+
+    Reads the operand bins from the OPERAND_BINS ConfigDB entry,
+    a dict of bin name to operand values, or uses the module's
+    OPERAND_BINS. A value in more than one bin goes in the first,
+    and every bin must keep at least one value. Values in no bin
+    go in an "other" bin, which exists only if there are any.
+    Each bin has an integer ID and a hit count in the counts
+    array. write() finds the IDs with table lookups, and
+    write_many() counts arrays of commands in one call. Both
+    skip commands whose op is not an Ops value, such as an op
+    that read as X/Z, and count them in illegal_ops.
+
+    report_phase() writes the counts to a coverage database named
+    for the test and seed in the COVERAGE_DB_DIR ConfigDB
+    directory (default "."), unless that entry is None.
+    merge_coverage.py merges the files from many runs.
+    """
+
+    def build_phase(self):
+        try:
+            operand_bins = ConfigDB().get(self, "", "OPERAND_BINS")
+        except UVMConfigItemNotFound:
+            operand_bins = OPERAND_BINS
+        self.operand_bin_names = list(operand_bins)
+        # operand_bin[value] is the bin number of an operand value.
+        # Values in no bin go in an "other" bin, if there are any.
+        other = len(operand_bins)
+        self.operand_bin = bytearray([other]) * 256
+        for (number, values) in reversed(list(enumerate(operand_bins.values()))):
+            for value in values:
+                self.operand_bin[value] = number
+        self.operand_values = [[] for _ in range(other + 1)]
+        for (value, number) in enumerate(self.operand_bin):
+            self.operand_values[number].append(value)
+        for (name, values) in zip(self.operand_bin_names, self.operand_values):
+            assert values, f"Operand bin {name} has no values of its own"
+        if self.operand_values[other]:
+            self.operand_bin_names.append("other")
+        else:
+            self.operand_values.pop()
+        self.bin_count = bin_count = len(self.operand_bin_names)
+        # Lists indexed by every 3-bit op value, which are faster
+        # than dicts keyed by Ops. Values outside Ops map to None.
+        self.op_base = [None] * 8
+        for (index, op) in enumerate(Ops):
+            self.op_base[op] = index * bin_count * bin_count
+        self.cross_bins = len(Ops) * bin_count * bin_count
+        self.carry_base = [None] * 8
+        for (index, op) in enumerate(CARRY_OPS):
+            self.carry_base[op] = self.cross_bins + 2 * index
+        self.counts = array("Q", [0]) * (self.cross_bins + 2 * len(CARRY_OPS))
+        self.illegal_ops = 0
+
+    def bin_id(self, A, B, op):
+        """The cross bin of a command, or None if op is not an Ops value"""
+        op_base = self.op_base[op]
+        if op_base is None:
+            return None
+        return op_base + self.operand_bin[A] * self.bin_count + self.operand_bin[B]
+
+    def bin_name(self, bin_id):
+        if bin_id >= self.cross_bins:
+            (index, carry) = divmod(bin_id - self.cross_bins, 2)
+            return f"{CARRY_OPS[index].name} {'carry' if carry else 'no carry'}"
+        bin_count = self.bin_count
+        (op_index, operands) = divmod(bin_id, bin_count * bin_count)
+        (a_bin, b_bin) = divmod(operands, bin_count)
+        return (f"{list(Ops)[op_index].name} A {self.operand_bin_names[a_bin]}"
+                f" B {self.operand_bin_names[b_bin]}")
+
+    def random_cmd(self, bin_id):
+        """A random (A, B, op) command that hits bin_id
+
+        Every bin can be hit, as build_phase() rejects empty bins.
+        """
+        if bin_id >= self.cross_bins:
+            (index, carry) = divmod(bin_id - self.cross_bins, 2)
+            op = CARRY_OPS[index]
+            while True:
+                A = random.randint(0, 255)
+                B = random.randint(0, 255)
+                if (ALU_OPERATORS[op](A, B) > 0xFF) == carry:
+                    return (A, B, op)
+        (op_index, operands) = divmod(bin_id, self.bin_count * self.bin_count)
+        (a_bin, b_bin) = divmod(operands, self.bin_count)
+        return (random.choice(self.operand_values[a_bin]),
+                random.choice(self.operand_values[b_bin]),
+                list(Ops)[op_index])
+
+    def write(self, cmd):
+        (A, B, op) = cmd
+        bin_id = self.bin_id(A, B, op)
+        if bin_id is None:
+            self.illegal_ops += 1
+            return
+        self.counts[bin_id] += 1
+        carry_base = self.carry_base[op]
+        if carry_base is not None:
+            self.counts[carry_base + (ALU_OPERATORS[op](A, B) > 0xFF)] += 1
+
+    def write_many(self, A, B, op):
+        """Count arrays of A, B, and op values"""
+        if np is None:
+            for cmd in zip(A, B, op):
+                self.write(cmd)
+            return
+        op = np.asarray(op, dtype=np.uint8)
+        legal = np.isin(op, list(Ops))
+        self.illegal_ops += len(op) - np.count_nonzero(legal)
+        A = np.asarray(A, dtype=np.uint8)[legal]
+        B = np.asarray(B, dtype=np.uint8)[legal]
+        op = op[legal]
+        bin_count = self.bin_count
+        operand_bin = np.frombuffer(self.operand_bin, dtype=np.uint8)
+        op_base = np.array([base or 0 for base in self.op_base], dtype=np.intp)
+        bin_ids = op_base[op] + operand_bin[A].astype(np.intp) * bin_count + operand_bin[B]
+        counts = np.frombuffer(self.counts, dtype=np.uint64)
+        counts += np.bincount(bin_ids, minlength=len(counts)).astype(np.uint64)
+        carries = alu_prediction_batch(A, B, op) > 0xFF
+        for carry_op in CARRY_OPS:
+            base = self.carry_base[carry_op]
+            is_op = op == carry_op
+            carry_count = np.count_nonzero(is_op & carries)
+            counts[base] += np.count_nonzero(is_op) - carry_count
+            counts[base + 1] += carry_count
+
+    def holes(self):
+        """The IDs of the bins with no hits"""
+        return [bin_id for (bin_id, count) in enumerate(self.counts)
+                if count == 0]
+
+    def bin_names(self):
+        return [self.bin_name(bin_id) for bin_id in range(len(self.counts))]
+
+    def report_phase(self):
+        holes = self.holes()
+        covered = len(self.counts) - len(holes)
+        self.logger.info(f"Cross coverage: {covered} of {len(self.counts)} "
+                         "bins hit")
+        if holes:
+            self.logger.warning("Cross coverage holes: " + ", ".join(
+                self.bin_name(bin_id) for bin_id in holes))
+        if self.illegal_ops:
+            self.logger.warning(f"Skipped {self.illegal_ops} commands whose "
+                                "op is not an Ops value")
+        try:
+            db_dir = ConfigDB().get(self, "", "COVERAGE_DB_DIR")
+        except UVMConfigItemNotFound:
+            db_dir = "."
+        if db_dir is not None:
+            test = type(uvm_root().uvm_test_top).__name__
+            seed = cocotb.RANDOM_SEED
+            write_coverage(Path(db_dir) / f"{test}.{seed}.cov",
+                           self.bin_names(), self.counts,
+                           test=test, seed=seed, directory=str(Path.cwd()))
+
+
+# ## Running until coverage closes
+class CoverageSeq(uvm_sequence):
+    """Sends random commands until a CrossCoverage has no holes
+
+    Polls the collector in the CROSS_COVERAGE ConfigDB entry
+    before each command and stops when it has no holes or after
+    COVERAGE_BUDGET commands (default 1000). A hole_bias fraction
+    of the commands target a randomly chosen hole, and the rest
+    are uniformly random, as in RandomSeq.
+    """
+    hole_bias = 0.9
+
+    async def body(self):
+        coverage = ConfigDB().get(None, "", "CROSS_COVERAGE")
+        try:
+            budget = ConfigDB().get(None, "", "COVERAGE_BUDGET")
+        except UVMConfigItemNotFound:
+            budget = 1000
+        sent = 0
+        holes = coverage.holes()
+        while holes and sent < budget:
+            if random.random() < self.hole_bias:
+                (aa, bb, op) = coverage.random_cmd(random.choice(holes))
+            else:
+                (aa, bb, op) = (random.randint(0, 255), random.randint(0, 255),
+                                random.choice(list(Ops)))
+            cmd_tr = AluSeqItem("cmd_tr", aa, bb, op)
+            await self.start_item(cmd_tr)
+            await self.finish_item(cmd_tr)
+            sent += 1
+            holes = coverage.holes()
+        if holes:
+            self.logger.warning(f"Spent the budget of {budget} commands "
+                                f"with {len(holes)} coverage holes")
+        else:
+            self.logger.info(f"Closed cross coverage in {sent} commands")